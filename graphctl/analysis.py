@@ -0,0 +1,76 @@
+from functools import cached_property
+import networkx as nx
+import numpy as np
+from .graph import bridges, local_bridges, clustering, group_nodes, triangle_counts
+
+
+class Analysis:
+    """Intermediate results of a graph that are shared between computations.
+
+    Every intermediate is computed the first time it is accessed and reused by
+    every topology measure, table and plot afterwards. Intermediates that were
+    computed elsewhere, e.g. in another process, can be handed in by name.
+    """
+
+    def __init__(self, G: nx.Graph or nx.DiGraph, graph: str, **intermediates):
+        self.G = G
+        self.graph = graph
+        # cached properties look up their value in the instance dict first
+        self.__dict__.update(intermediates)
+
+    @cached_property
+    def degree(self) -> np.ndarray:
+        """The degree of every node, in node order."""
+        return np.fromiter(
+            (d for _, d in self.G.degree()), dtype=np.int64, count=len(self.G)
+        )
+
+    @cached_property
+    def degree_centrality(self) -> dict:
+        """The degree centrality of every node, in node order."""
+        if len(self.G) <= 1:
+            return {n: 1 for n in self.G}
+
+        s = 1.0 / (len(self.G) - 1.0)
+
+        return dict(zip(self.G, (self.degree * s).tolist()))
+
+    @cached_property
+    def triangles(self) -> np.ndarray:
+        """The number of triangles every node is part of, in node order."""
+        return triangle_counts(self.G)
+
+    @cached_property
+    def clustering(self) -> dict:
+        """The clustering coefficient of every node.
+
+        For undirected graphs it is derived from the triangles.
+        """
+        if self.G.is_directed():
+            return clustering(self.G)
+
+        return clustering(self.G, self.triangles)
+
+    @cached_property
+    def bridges(self) -> list:
+        return bridges(self.G)
+
+    @cached_property
+    def local_bridges(self) -> list:
+        return local_bridges(self.G)
+
+    @cached_property
+    def components(self) -> list:
+        """The connected components of the graph, weakly connected if directed.
+
+        Graphs built from arrays label the component of every node while they are
+        built, their components are arrays of nodes.
+        """
+        labels = self.G.graph.get("components")
+        if labels is not None:
+            return group_nodes(labels)
+
+        if self.G.is_directed():
+            return list(nx.weakly_connected_components(self.G))
+
+        return list(nx.connected_components(self.G))
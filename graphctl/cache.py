@@ -0,0 +1,131 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from os.path import expanduser, join
+import numpy as np
+
+
+def cache_dir() -> str:
+    """The directory that holds cached graphs.
+
+    It can be set with the `GRAPHCTL_CACHE_DIR` environment variable and defaults
+    to `graphctl` inside of the user cache directory.
+    """
+    if "GRAPHCTL_CACHE_DIR" in os.environ:
+        return os.environ["GRAPHCTL_CACHE_DIR"]
+
+    base = os.environ.get("XDG_CACHE_HOME") or expanduser("~/.cache")
+
+    return join(base, "graphctl")
+
+
+def file_hash(input: str) -> str:
+    """Hash the contents of a file with SHA-256."""
+    h = hashlib.sha256()
+
+    with open(input, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def graph_key(input: str, graph: str) -> str:
+    """The cache key of a graph parsed from input."""
+    return f"{file_hash(input)}-{graph}"
+
+
+def encode_labels(labels: list) -> tuple:
+    """Pack node labels into a byte blob and the offsets into it."""
+    encoded = [label.encode("utf-8") for label in labels]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_labels(blob: np.ndarray, offsets: np.ndarray) -> list:
+    """Unpack node labels packed by `encode_labels`."""
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+
+    return [data[i:j].decode("utf-8") for i, j in zip(bounds, bounds[1:])]
+
+
+def load_arrays(name: str):
+    """Load the arrays stored in the cache under name.
+
+    Returns `None` if nothing is stored under that name.
+    """
+    path = join(cache_dir(), f"{name}.npz")
+
+    try:
+        with np.load(path) as arrays:
+            return dict(arrays)
+    except (OSError, ValueError):
+        return None
+
+
+def save_arrays(name: str, **arrays):
+    """Store arrays in the cache under name."""
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary file first, concurrent runs never see partial files.
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, join(directory, f"{name}.npz"))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_cached_graph(key: str):
+    """Load the node labels and edges of a cached graph.
+
+    Returns `None` if the graph is not in the cache.
+    """
+    arrays = load_arrays(key)
+
+    try:
+        return decode_labels(arrays["labels"], arrays["offsets"]), arrays["edges"]
+    except (TypeError, KeyError):
+        return None
+
+
+def save_cached_graph(key: str, labels: list, edges: np.ndarray):
+    """Store the node labels and edges of a graph in the cache."""
+    blob, offsets = encode_labels(labels)
+
+    save_arrays(key, labels=blob, offsets=offsets, edges=edges)
+
+
+def edges_hash(edges: np.ndarray, graph: str) -> str:
+    """Hash the structure of a graph, independent of its node labels."""
+    h = hashlib.sha256(graph.encode("utf-8"))
+    h.update(np.ascontiguousarray(edges, dtype=np.int32).tobytes())
+
+    return h.hexdigest()
+
+
+def load_cached_layout(key: str):
+    """Load the node positions of a cached layout.
+
+    Returns `None` if the layout is not in the cache.
+    """
+    arrays = load_arrays(f"layout-{key}")
+
+    return None if arrays is None else arrays.get("positions")
+
+
+def save_cached_layout(key: str, positions: np.ndarray):
+    """Store the node positions of a layout in the cache."""
+    save_arrays(f"layout-{key}", positions=positions)
+
+
+def clear_cache():
+    """Remove all cached graphs and layouts."""
+    shutil.rmtree(cache_dir(), ignore_errors=True)
@@ -1,44 +1,73 @@
 import click
-from .graph import (
-    build_graph,
-    degree_centrality,
-    degree_in_centrality,
-    degree_out_centrality,
-    betweenness_centrality,
-    closeness_centrality,
-    eigenvector_centrality,
-    k_clique_communities,
-    louvain_communities,
-    label_propagation_communities,
-    clustering,
-)
-from .data import (
-    compute_basic_topology,
-    map_directed_degree_centrality,
-    map_undirected_degree_centrality,
-    map_centrality_neighbours,
-    map_centrality_data,
-    map_communities,
-)
-from .host import write_to_file
-from .plot import (
-    render_graph,
-    render_bridges,
-    render_centrality_distribution,
-    render_centrality_graph,
-    render_community,
-)
+from .host import FORMATS, read_from_file, write_to_file
+from .utils import LAYOUTS, RENDERERS
 import os
 from os.path import join
 
-
 GRAPH_TYPES = ["directed", "undirected"]
+OUTPUTS = [
+    "topology",
+    "graph",
+    "bridges",
+    "degree",
+    "betweenness",
+    "eigenvector",
+    "closeness",
+    "clustering",
+]
+
+
+@click.group(invoke_without_command=True)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Load parsed graphs from the cache and store them there.",
+)
+@click.option("--clear-cache", is_flag=True, help="Remove all cached graphs.")
+@click.pass_context
+def cli(ctx, cache, clear_cache):
+    # Commands import the modules they need themselves, networkx, numpy and
+    # matplotlib take long to import and most runs only need some of them.
+    if clear_cache:
+        from .cache import clear_cache as clear_cache_dir
 
+        clear_cache_dir()
+    elif ctx.invoked_subcommand is None:
+        click.echo(ctx.get_help())
 
-@click.group()
-@click.pass_context
-def cli(ctx):
-    pass
+    ctx.obj = {"cache": cache}
+
+
+def load_graph(input, graph):
+    """Build the graph for a command according to the global cache options."""
+    from .graph import build_graph
+
+    options = click.get_current_context().find_root().obj or {}
+
+    return build_graph(input, graph, cache=options.get("cache", True))
+
+
+def load_layout(G, iterations, seed, method="spring"):
+    """Compute the layout of a graph according to the global cache options."""
+    from .plot import layout
+
+    options = click.get_current_context().find_root().obj or {}
+
+    return layout(G, iterations, seed, options.get("cache", True), method)
+
+
+def load_nstart(G, warm_start):
+    """Read a previous eigenvector centrality to start the iteration from."""
+    if warm_start is None:
+        return None
+
+    index = {label: i for i, label in enumerate(G.graph["labels"])}
+
+    return {
+        index[row["node"]]: float(row["eigenvector"])
+        for row in read_from_file(warm_start)
+        if row["node"] in index
+    }
 
 
 @cli.command("all")
@@ -48,149 +77,260 @@ def cli(ctx):
     type=click.Choice(GRAPH_TYPES),
     default="undirected",
 )
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of worker processes for computations and plots, 0 uses all cores.",
+)
+@click.option(
+    "--approximate",
+    is_flag=True,
+    help="Approximate the diameter and average path of large components.",
+)
+@click.option(
+    "--path-samples",
+    type=click.IntRange(min=2),
+    default=100,
+    help="Number of BFS sources to estimate the average path from.",
+)
+@click.option(
+    "--samples",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Estimate betweenness from this many sampled pivot sources.",
+)
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Keep sampling pivots until the top ranked nodes settle.",
+)
+@click.option(
+    "--adaptive-top",
+    type=click.IntRange(min=1),
+    default=100,
+    help="Number of top ranked nodes that have to settle.",
+)
+@click.option(
+    "--adaptive-tolerance",
+    type=click.FloatRange(min=0, max=1),
+    default=0.1,
+    help="Share of the top ranked nodes that may change between batches.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    help="Seed of the random sampling and the graph layout.",
+)
+@click.option("--iterations", type=int, default=15)
+@click.option(
+    "--layout",
+    "layout_method",
+    type=click.Choice(LAYOUTS),
+    default="spring",
+    help="Layout method, multilevel scales to very large graphs.",
+)
+@click.option(
+    "--renderer",
+    type=click.Choice(RENDERERS),
+    default="default",
+    help="Renderer of the graph plots, fast draws huge graphs in batches.",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=1.0e-6,
+    help="Error tolerance of the eigenvector centrality iteration.",
+)
+@click.option(
+    "--max-iter",
+    type=int,
+    default=100,
+    help="Maximum number of power iterations of the eigenvector centrality.",
+)
+@click.option(
+    "--warm-start",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    help="Start the eigenvector centrality from a previous result.",
+)
+@click.option(
+    "--per-component",
+    is_flag=True,
+    help="Compute the eigenvector centrality of every component on its own.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the top N ranked nodes of every centrality.",
+)
+@click.option(
+    "--only",
+    type=click.Choice(OUTPUTS),
+    multiple=True,
+    help="Only compute these outputs, can be given several times.",
+)
+@click.option(
+    "--skip",
+    type=click.Choice(OUTPUTS),
+    multiple=True,
+    help="Skip these outputs, can be given several times.",
+)
+@click.option(
+    "--restart",
+    is_flag=True,
+    help="Compute everything again instead of resuming a previous run.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument(
     "outdir",
     type=click.Path(writable=True, dir_okay=True, file_okay=False),
     default="out",
 )
-def all(graph, input, outdir):
-    G = build_graph(input, graph)
+def all(
+    graph,
+    jobs,
+    approximate,
+    path_samples,
+    samples,
+    adaptive,
+    adaptive_top,
+    adaptive_tolerance,
+    seed,
+    iterations,
+    layout_method,
+    renderer,
+    tolerance,
+    max_iter,
+    warm_start,
+    per_component,
+    top,
+    output_format,
+    only,
+    skip,
+    restart,
+    input,
+    outdir,
+):
+    from .pipeline import Checkpoint, all_tasks, run, select
+
+    options = click.get_current_context().find_root().obj or {}
+    G = load_graph(input, graph)
 
     os.makedirs(outdir, exist_ok=True)
 
-    # Topology
-    topology_basic_file = join(outdir, "topology.csv")
-    topology_basic_data = compute_basic_topology(G, graph)
-    write_to_file(topology_basic_file, topology_basic_data)
-
-    graph_plot_file = join(outdir, "graph.png")
-    render_graph(G, graph_plot_file)
-
-    if graph == "undirected":
-        bridges_plot_file = join(outdir, "bridges.png")
-        render_bridges(G, bridges_plot_file)
-
-    # Degree Centrality
-    centrality_degree_file = join(outdir, "centrality-degree.csv")
-    centrality_degree_neighbours_file = join(outdir, "centrality-degree-neighbours.csv")
-    centrality_degree_plot_file = join(outdir, "degree-centrality.png")
-    centrality_degree_neighbours_plot_file = join(
-        outdir, "degree-centrality-distribution.png"
-    )
-    centrality_degree_data = degree_centrality(G)
-    if graph == "undirected":
-        write_to_file(
-            centrality_degree_file,
-            map_undirected_degree_centrality(centrality_degree_data),
-        )
-    elif graph == "undirected":
-        centrality_degree_in_data = degree_in_centrality(G)
-        centrality_degree_out_data = degree_out_centrality(G)
-        write_to_file(
-            centrality_degree_file,
-            map_directed_degree_centrality(
-                centrality_degree_data,
-                centrality_degree_in_data,
-                centrality_degree_out_data,
-            ),
-        )
-
-    write_to_file(
-        centrality_degree_neighbours_file,
-        map_centrality_neighbours(
-            sorted(G.degree, key=lambda item: item[1], reverse=True)
-        ),
-    )
-    render_centrality_graph(G, centrality_degree_data, centrality_degree_plot_file)
-    render_centrality_distribution(
-        centrality_degree_data,
-        centrality_degree_neighbours_plot_file,
-        title="Degree Centrality Histogram",
+    tasks = all_tasks(
+        graph,
+        outdir,
+        jobs=jobs,
+        path_samples=path_samples if approximate else None,
+        samples=samples,
+        adaptive=adaptive,
+        adaptive_top=adaptive_top,
+        adaptive_tolerance=adaptive_tolerance,
+        seed=seed,
+        iterations=iterations,
+        layout_method=layout_method,
+        renderer=renderer,
+        tolerance=tolerance,
+        max_iter=max_iter,
+        nstart=load_nstart(G, warm_start),
+        per_component=per_component,
+        top=top,
+        output_format=output_format,
+        cache=options.get("cache", True),
     )
 
-    # Betweenness Centrality
-    centrality_betweenness_file = join(outdir, "centrality-betweenness.csv")
-    centrality_betweenness_plot_file = join(outdir, "betweenness-centrality.png")
-    centrality_betweenness_distribution_plot_file = join(
-        outdir, "betweenness-centrality-distribution.png"
-    )
+    tasks = select(tasks, only, skip)
+    run(G, tasks, jobs, Checkpoint(outdir, G, tasks, resume=not restart))
 
-    centrality_betweenness_data = betweenness_centrality(G)
-    write_to_file(
-        centrality_betweenness_file,
-        map_centrality_data(centrality_betweenness_data, "betweenness"),
-    )
 
-    render_centrality_distribution(
-        centrality_betweenness_data,
-        centrality_betweenness_distribution_plot_file,
-        title="Betweenness Centrality Histogram",
-    )
-    render_centrality_graph(
-        G,
-        centrality_betweenness_data,
-        centrality_betweenness_plot_file,
-        size_multiplier=1200,
+@cli.command("update")
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of worker processes, 0 uses all cores.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the top N ranked nodes.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("state", type=click.Path(exists=True, readable=True, dir_okay=False))
+@click.argument("delta", type=click.Path(exists=True, readable=True, allow_dash=True))
+@click.argument(
+    "outdir",
+    type=click.Path(writable=True, dir_okay=True, file_okay=False),
+    required=False,
+)
+def update(jobs, top, output_format, state, delta, outdir):
+    from .pipeline import (
+        compute_degree_centrality,
+        forget,
+        write_degree,
+        write_topology,
     )
+    from .state import IncrementalTopology, load_state
 
-    # Eigenvector Centrality
-    centrality_eigenvector_file = join(outdir, "centrality-eigenvector.csv")
-    centrality_eigenvector_plot_file = join(outdir, "eigenvector-centrality.png")
-    centrality_eigenvector_distribution_plot_file = join(
-        outdir, "eigenvector-centrality-distribution.png"
+    outdir = outdir or os.path.dirname(state) or "."
+    os.makedirs(outdir, exist_ok=True)
+    # the directory of the state is usually the one of `all`, whose manifest
+    # would still take the replaced files for the ones of the old edges
+    forget(
+        outdir,
+        [
+            f"topology.{output_format}",
+            "state.npz",
+            f"centrality-degree.{output_format}",
+            f"centrality-degree-neighbours.{output_format}",
+        ],
     )
 
-    centrality_eigenvector_data = eigenvector_centrality(G)
-    write_to_file(
-        centrality_eigenvector_file,
-        map_centrality_data(centrality_eigenvector_data, "eigenvector"),
-    )
+    topology = IncrementalTopology(load_state(state))
+    topology.add_edges_from(delta)
+    intermediates, component_stats = topology.intermediates(jobs)
+    G = topology.G
 
-    render_centrality_distribution(
-        centrality_eigenvector_data,
-        centrality_eigenvector_distribution_plot_file,
-        title="Eigenvector Centrality Histogram",
-    )
-    render_centrality_graph(
+    write_topology(
         G,
-        centrality_eigenvector_data,
-        centrality_eigenvector_plot_file,
-        size_multiplier=4000,
-    )
-
-    # Closeness Centrality
-    centrality_closeness_file = join(outdir, "centrality-closeness.csv")
-    centrality_closeness_plot_file = join(outdir, "closeness-centrality.png")
-    centrality_closeness_distribution_plot_file = join(
-        outdir, "closeness-centrality-distribution.png"
-    )
-
-    centrality_closeness_data = closeness_centrality(G)
-    write_to_file(
-        centrality_closeness_file,
-        map_centrality_data(centrality_closeness_data, "closeness"),
-    )
-
-    render_centrality_distribution(
-        centrality_closeness_data,
-        centrality_closeness_distribution_plot_file,
-        title="Closeness Centrality Histogram",
+        "undirected",
+        jobs,
+        topology.samples,
+        topology.seed,
+        join(outdir, f"topology.{output_format}"),
+        output_format,
+        state_output=join(outdir, "state.npz"),
+        component_stats=component_stats,
+        **intermediates,
     )
-    render_centrality_graph(
+    write_degree(
         G,
-        centrality_closeness_data,
-        centrality_closeness_plot_file,
-        size_multiplier=50,
-    )
-
-    # Clustering
-    clustering_distribution_plot_file = join(outdir, "clustering-distribution.png")
-    clustering_data = clustering(G)
-    render_centrality_distribution(
-        clustering_data,
-        clustering_distribution_plot_file,
-        title="Clustering Histogram",
+        "undirected",
+        join(outdir, f"centrality-degree.{output_format}"),
+        join(outdir, f"centrality-degree-neighbours.{output_format}"),
+        intermediates["degree"],
+        compute_degree_centrality(G, "undirected", intermediates["degree"]),
+        top,
+        output_format,
     )
 
 
@@ -207,12 +347,58 @@ def topology(ctx):
     type=click.Choice(GRAPH_TYPES),
     default="undirected",
 )
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of worker processes, 0 uses all cores.",
+)
+@click.option(
+    "--approximate",
+    is_flag=True,
+    help="Approximate the diameter and average path of large components.",
+)
+@click.option(
+    "--path-samples",
+    type=click.IntRange(min=2),
+    default=100,
+    help="Number of BFS sources to estimate the average path from.",
+)
+@click.option("--seed", type=int, default=0, help="Seed of the random sampling.")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.option(
+    "--state",
+    type=click.Path(writable=True, dir_okay=False),
+    help="Save the state that `update` adds new edges to.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def topology_basic(graph, input, output):
-    G = build_graph(input, graph)
-    data = compute_basic_topology(G, graph)
-    write_to_file(output, data)
+def topology_basic(
+    graph, jobs, approximate, path_samples, seed, output_format, state, input, output
+):
+    from .pipeline import write_topology
+
+    if state is not None and graph != "undirected":
+        raise click.UsageError("Only the state of undirected graphs can be saved.")
+
+    G = load_graph(input, graph)
+    write_topology(
+        G,
+        graph,
+        jobs,
+        path_samples if approximate else None,
+        seed,
+        output,
+        output_format,
+        state_output=state,
+    )
 
 
 @cli.group()
@@ -229,12 +415,33 @@ def plot(ctx):
     default="undirected",
 )
 @click.option("--iterations", type=int, default=15)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--layout",
+    "layout_method",
+    type=click.Choice(LAYOUTS),
+    default="spring",
+    help="Layout method, multilevel scales to very large graphs.",
+)
+@click.option(
+    "--renderer",
+    type=click.Choice(RENDERERS),
+    default="default",
+    help="Renderer of the graph plots, fast draws huge graphs in batches.",
+)
+@click.option("--seed", type=int, default=0, help="Seed of the graph layout.")
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="graph.png")
-def plot_graph(graph, iterations, input, output):
-    G = build_graph(input, graph)
+def plot_graph(graph, iterations, layout_method, renderer, seed, input, output):
+    from .plot import render_graph
+
+    G = load_graph(input, graph)
 
-    render_graph(G, output, iterations)
+    render_graph(
+        G,
+        output,
+        pos=load_layout(G, iterations, seed, layout_method),
+        renderer=renderer,
+    )
 
 
 @plot.command("bridges")
@@ -245,12 +452,33 @@ def plot_graph(graph, iterations, input, output):
     default="undirected",
 )
 @click.option("--iterations", type=int, default=15)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--layout",
+    "layout_method",
+    type=click.Choice(LAYOUTS),
+    default="spring",
+    help="Layout method, multilevel scales to very large graphs.",
+)
+@click.option(
+    "--renderer",
+    type=click.Choice(RENDERERS),
+    default="default",
+    help="Renderer of the graph plots, fast draws huge graphs in batches.",
+)
+@click.option("--seed", type=int, default=0, help="Seed of the graph layout.")
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="bridges.png")
-def plot_bridges(graph, iterations, input, output):
-    G = build_graph(input, graph)
+def plot_bridges(graph, iterations, layout_method, renderer, seed, input, output):
+    from .plot import render_bridges
 
-    render_bridges(G, output, iterations)
+    G = load_graph(input, graph)
+
+    render_bridges(
+        G,
+        output,
+        pos=load_layout(G, iterations, seed, layout_method),
+        renderer=renderer,
+    )
 
 
 @plot.command("degree-centrality-distribution")
@@ -262,14 +490,17 @@ def plot_bridges(graph, iterations, input, output):
 )
 @click.option("--iterations", type=int, default=15)
 @click.option("--bins", type=int, default=100)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument(
     "output",
     type=click.Path(writable=True),
     default="degree-centrality-distribution.png",
 )
 def plot_degree_centrality_distribution(graph, iterations, bins, input, output):
-    G = build_graph(input, graph)
+    from .graph import degree_centrality
+    from .plot import render_centrality_distribution
+
+    G = load_graph(input, graph)
 
     data = degree_centrality(G)
     render_centrality_distribution(
@@ -286,16 +517,28 @@ def plot_degree_centrality_distribution(graph, iterations, bins, input, output):
 )
 @click.option("--iterations", type=int, default=15)
 @click.option("--bins", type=int, default=100)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of worker processes, 0 uses all cores.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument(
     "output",
     type=click.Path(writable=True),
     default="betweenness-centrality-distribution.png",
 )
-def plot_betweenness_centrality_distribution(graph, iterations, bins, input, output):
-    G = build_graph(input, graph)
+def plot_betweenness_centrality_distribution(
+    graph, iterations, bins, jobs, input, output
+):
+    from .graph import betweenness_centrality
+    from .plot import render_centrality_distribution
 
-    data = betweenness_centrality(G)
+    G = load_graph(input, graph)
+
+    data = betweenness_centrality(G, jobs)
     render_centrality_distribution(
         data, output, title="Betweenness Centrality Histogram", bins=bins
     )
@@ -310,14 +553,17 @@ def plot_betweenness_centrality_distribution(graph, iterations, bins, input, out
 )
 @click.option("--iterations", type=int, default=15)
 @click.option("--bins", type=int, default=100)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument(
     "output",
     type=click.Path(writable=True),
     default="eigenvector-centrality-distribution.png",
 )
 def plot_eigenvector_centrality_distribution(graph, iterations, bins, input, output):
-    G = build_graph(input, graph)
+    from .graph import eigenvector_centrality
+    from .plot import render_centrality_distribution
+
+    G = load_graph(input, graph)
 
     data = eigenvector_centrality(G)
     render_centrality_distribution(
@@ -334,16 +580,28 @@ def plot_eigenvector_centrality_distribution(graph, iterations, bins, input, out
 )
 @click.option("--iterations", type=int, default=15)
 @click.option("--bins", type=int, default=100)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of worker processes, 0 uses all cores.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument(
     "output",
     type=click.Path(writable=True),
     default="closeness-centrality-distribution.png",
 )
-def plot_closeness_centrality_distribution(graph, iterations, bins, input, output):
-    G = build_graph(input, graph)
+def plot_closeness_centrality_distribution(
+    graph, iterations, bins, jobs, input, output
+):
+    from .graph import closeness_centrality
+    from .plot import render_centrality_distribution
+
+    G = load_graph(input, graph)
 
-    data = closeness_centrality(G)
+    data = closeness_centrality(G, jobs)
     render_centrality_distribution(
         data, output, title="Closeness Centrality Histogram", bins=bins
     )
@@ -357,13 +615,38 @@ def plot_closeness_centrality_distribution(graph, iterations, bins, input, outpu
     default="undirected",
 )
 @click.option("--iterations", type=int, default=15)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--layout",
+    "layout_method",
+    type=click.Choice(LAYOUTS),
+    default="spring",
+    help="Layout method, multilevel scales to very large graphs.",
+)
+@click.option(
+    "--renderer",
+    type=click.Choice(RENDERERS),
+    default="default",
+    help="Renderer of the graph plots, fast draws huge graphs in batches.",
+)
+@click.option("--seed", type=int, default=0, help="Seed of the graph layout.")
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="graph.png")
-def plot_label_propagation_community(graph, iterations, input, output):
-    G = build_graph(input, graph)
+def plot_label_propagation_community(
+    graph, iterations, layout_method, renderer, seed, input, output
+):
+    from .graph import label_propagation_communities
+    from .plot import render_community
+
+    G = load_graph(input, graph)
     communities = label_propagation_communities(G)
 
-    render_community(G, communities, output, iterations)
+    render_community(
+        G,
+        communities,
+        output,
+        pos=load_layout(G, iterations, seed, layout_method),
+        renderer=renderer,
+    )
 
 
 @cli.group()
@@ -379,16 +662,32 @@ def centrality(ctx):
     type=click.Choice(GRAPH_TYPES),
     default="undirected",
 )
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the top N ranked nodes.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def centrality_degree(graph, input, output):
-    G = build_graph(input, graph)
+def centrality_degree(graph, top, output_format, input, output):
+    from .graph import degree_centrality, degree_in_centrality, degree_out_centrality
+    from .data import map_directed_degree_centrality, map_undirected_degree_centrality
+
+    G = load_graph(input, graph)
 
     centrality_degree_data = degree_centrality(G)
 
     if graph == "undirected":
-        data = map_undirected_degree_centrality(centrality_degree_data)
-    elif graph == "undirected":
+        data = map_undirected_degree_centrality(centrality_degree_data, top)
+    elif graph == "directed":
         centrality_degree_in_data = degree_in_centrality(G)
         centrality_degree_out_data = degree_out_centrality(G)
 
@@ -396,9 +695,10 @@ def centrality_degree(graph, input, output):
             centrality_degree_data,
             centrality_degree_in_data,
             centrality_degree_out_data,
+            top,
         )
 
-    write_to_file(output, data)
+    write_to_file(output, data, G.graph["labels"], output_format)
 
 
 @centrality.command("betweenness")
@@ -408,16 +708,77 @@ def centrality_degree(graph, input, output):
     type=click.Choice(GRAPH_TYPES),
     default="undirected",
 )
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of worker processes, 0 uses all cores.",
+)
+@click.option(
+    "--samples",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Estimate betweenness from this many sampled pivot sources.",
+)
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Keep sampling pivots until the top ranked nodes settle.",
+)
+@click.option(
+    "--adaptive-top",
+    type=click.IntRange(min=1),
+    default=100,
+    help="Number of top ranked nodes that have to settle.",
+)
+@click.option(
+    "--adaptive-tolerance",
+    type=click.FloatRange(min=0, max=1),
+    default=0.1,
+    help="Share of the top ranked nodes that may change between batches.",
+)
+@click.option("--seed", type=int, default=0, help="Seed of the random sampling.")
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the top N ranked nodes.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def centrality_betweenness(graph, input, output):
-    G = build_graph(input, graph)
-
-    centrality = betweenness_centrality(G)
+def centrality_betweenness(
+    graph,
+    jobs,
+    samples,
+    adaptive,
+    adaptive_top,
+    adaptive_tolerance,
+    seed,
+    top,
+    output_format,
+    input,
+    output,
+):
+    from .data import map_centrality_data
+    from .pipeline import compute_betweenness
+
+    G = load_graph(input, graph)
+
+    centrality, samples = compute_betweenness(
+        G, jobs, samples, adaptive, adaptive_top, seed, adaptive_tolerance
+    )
 
-    data = map_centrality_data(centrality, "betweenness")
+    data = map_centrality_data(centrality, "betweenness", samples, top)
 
-    write_to_file(output, data)
+    write_to_file(output, data, G.graph["labels"], output_format)
 
 
 @centrality.command("closeness")
@@ -427,16 +788,39 @@ def centrality_betweenness(graph, input, output):
     type=click.Choice(GRAPH_TYPES),
     default="undirected",
 )
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="Number of worker processes, 0 uses all cores.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the top N ranked nodes.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def centrality_closeness(graph, input, output):
-    G = build_graph(input, graph)
+def centrality_closeness(graph, jobs, top, output_format, input, output):
+    from .graph import closeness_centrality
+    from .data import map_centrality_data
 
-    centrality = closeness_centrality(G)
+    G = load_graph(input, graph)
 
-    data = map_centrality_data(centrality, "closeness")
+    centrality = closeness_centrality(G, jobs)
 
-    write_to_file(output, data)
+    data = map_centrality_data(centrality, "closeness", top=top)
+
+    write_to_file(output, data, G.graph["labels"], output_format)
 
 
 @centrality.command("eigenvector")
@@ -446,16 +830,66 @@ def centrality_closeness(graph, input, output):
     type=click.Choice(GRAPH_TYPES),
     default="undirected",
 )
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--tolerance",
+    type=float,
+    default=1.0e-6,
+    help="Error tolerance of the eigenvector centrality iteration.",
+)
+@click.option(
+    "--max-iter",
+    type=int,
+    default=100,
+    help="Maximum number of power iterations of the eigenvector centrality.",
+)
+@click.option(
+    "--warm-start",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    help="Start the eigenvector centrality from a previous result.",
+)
+@click.option(
+    "--per-component",
+    is_flag=True,
+    help="Compute the eigenvector centrality of every component on its own.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the top N ranked nodes.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def centrality_eigenvector(graph, input, output):
-    G = build_graph(input, graph)
-
-    centrality = eigenvector_centrality(G)
+def centrality_eigenvector(
+    graph,
+    tolerance,
+    max_iter,
+    warm_start,
+    per_component,
+    top,
+    output_format,
+    input,
+    output,
+):
+    from .graph import eigenvector_centrality
+    from .data import map_centrality_data
+
+    G = load_graph(input, graph)
+
+    centrality = eigenvector_centrality(
+        G, max_iter, tolerance, load_nstart(G, warm_start), per_component
+    )
 
-    data = map_centrality_data(centrality, "eigenvector")
+    data = map_centrality_data(centrality, "eigenvector", top=top)
 
-    write_to_file(output, data)
+    write_to_file(output, data, G.graph["labels"], output_format)
 
 
 @cli.group()
@@ -472,16 +906,26 @@ def community(ctx):
     default="undirected",
 )
 @click.option("-k", type=int, default=100)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def communities_k_clique(graph, k, input, output):
-    G = build_graph(input, graph)
+def communities_k_clique(graph, k, output_format, input, output):
+    from .graph import k_clique_communities
+    from .data import map_communities
+
+    G = load_graph(input, graph)
 
     communities = k_clique_communities(G, k)
 
     data = map_communities(communities)
 
-    write_to_file(output, data)
+    write_to_file(output, data, G.graph["labels"], output_format)
 
 
 @community.command("louvain")
@@ -492,16 +936,26 @@ def communities_k_clique(graph, k, input, output):
     default="undirected",
 )
 @click.option("-k", type=int, default=100)
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def communities_louvain(graph, k, input, output):
-    G = build_graph(input, graph)
+def communities_louvain(graph, k, output_format, input, output):
+    from .graph import louvain_communities
+    from .data import map_communities
+
+    G = load_graph(input, graph)
 
     communities = louvain_communities(G, k)
 
     data = map_communities(communities)
 
-    write_to_file(output, data)
+    write_to_file(output, data, G.graph["labels"], output_format)
 
 
 @community.command("label-propagation")
@@ -511,12 +965,22 @@ def communities_louvain(graph, k, input, output):
     type=click.Choice(GRAPH_TYPES),
     default="undirected",
 )
-@click.argument("input", type=click.Path(exists=True, readable=True))
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="csv",
+    help="Format of the written tables, npz and parquet keep the column types.",
+)
+@click.argument("input", type=click.Path(exists=True, readable=True, allow_dash=True))
 @click.argument("output", type=click.Path(writable=True), default="out.csv")
-def communities_label_propagation(graph, input, output):
-    G = build_graph(input, graph)
+def communities_label_propagation(graph, output_format, input, output):
+    from .graph import label_propagation_communities
+    from .data import map_communities
+
+    G = load_graph(input, graph)
 
     communities = label_propagation_communities(G)
     data = map_communities(communities)
 
-    write_to_file(output, data)
+    write_to_file(output, data, G.graph["labels"], output_format)
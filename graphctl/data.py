@@ -29,48 +29,94 @@ from .graph import (
     k_clique_communities,
     louvain_communities,
 )
-from .utils import float_str
+from .analysis import Analysis
 import networkx as nx
+import numpy as np
+
+
+def compute_basic_topology(
+    G: nx.Graph or nx.DiGraph,
+    graph,
+    analysis: Analysis = None,
+    jobs: int = 1,
+    samples: int = None,
+    seed: int = None,
+    component_stats: list = None,
+) -> list[dict]:
+    """The basic topology of G as a list of measures and their values.
+
+    The stats of the components are computed unless they are handed in as
+    component_stats, e.g. from a previous run.
+    """
+    if analysis is None:
+        analysis = Analysis(G, graph)
 
-
-def compute_basic_topology(G: nx.Graph or nx.DiGraph, graph) -> list[dict]:
     data = []
 
     data.append({"measure": "Number of Nodes", "value": count_nodes(G)})
     data.append({"measure": "Number of Edges", "value": count_edges(G)})
-    data.append({"measure": "Average Degree of Node", "value": avg_node_degree(G)})
+    data.append(
+        {
+            "measure": "Average Degree of Node",
+            "value": avg_node_degree(G, analysis.degree),
+        }
+    )
     data.append({"measure": "Graph Density", "value": density(G)})
-    data.append({"measure": "Average Clustering", "value": avg_clustering(G)})
+    data.append(
+        {
+            "measure": "Average Clustering",
+            "value": avg_clustering(G, analysis.clustering),
+        }
+    )
     data.append({"measure": "Degree Assortativity", "value": assortativity(G)})
 
     if graph == "undirected":
         data.append(
             {
                 "measure": "Count of Unique Triangles in the Network",
-                "value": int(count_triangles(G)),
+                "value": int(count_triangles(G, analysis.triangles)),
             }
         )
         data.append(
             {
                 "measure": "Average Triangles a Node is part of",
-                "value": avg_triangles(G),
+                "value": avg_triangles(G, analysis.triangles),
             }
         )
         data.append(
             {
                 "measure": "Median Triangles a Node is part of",
-                "value": median_triangles(G),
+                "value": median_triangles(G, analysis.triangles),
+            }
+        )
+        data.append(
+            {"measure": "Has Bridges?", "value": has_bridges(G, analysis.bridges)}
+        )
+        data.append(
+            {"measure": "Count Bridges", "value": count_bridges(G, analysis.bridges)}
+        )
+        data.append(
+            {
+                "measure": "Count Local Bridges",
+                "value": count_local_bridges(G, analysis.local_bridges),
             }
         )
-        data.append({"measure": "Has Bridges?", "value": has_bridges(G)})
-        data.append({"measure": "Count Bridges", "value": count_bridges(G)})
-        data.append({"measure": "Count Local Bridges", "value": count_local_bridges(G)})
-        data.append({"measure": "Is Connected?", "value": is_connected(G)})
         data.append(
-            {"measure": "Number of Components", "value": count_connected_components(G)}
+            {
+                "measure": "Is Connected?",
+                "value": is_connected(G, analysis.components),
+            }
+        )
+        data.append(
+            {
+                "measure": "Number of Components",
+                "value": count_connected_components(G, analysis.components),
+            }
         )
 
-        components = stats_components(G)
+        components = component_stats
+        if components is None:
+            components = stats_components(G, analysis.components, jobs, samples, seed)
 
         for component in components:
             id = component["id"]
@@ -93,16 +139,39 @@ def compute_basic_topology(G: nx.Graph or nx.DiGraph, graph) -> list[dict]:
                     "value": component["diameter"],
                 }
             )
+            if samples is not None:
+                data.append(
+                    {
+                        "measure": f"Diameter Upper Bound (component {id})",
+                        "value": component["diameter_upper"],
+                    }
+                )
             data.append(
                 {
                     "measure": f"Average Path (component {id})",
                     "value": component["average_path"],
                 }
             )
+            if samples is not None:
+                data.append(
+                    {
+                        "measure": f"Average Path 95% Confidence (component {id})",
+                        "value": component["average_path_confidence"],
+                    }
+                )
+                data.append(
+                    {
+                        "measure": f"Average Path Samples (component {id})",
+                        "value": component["samples"],
+                    }
+                )
 
     if graph == "directed":
         data.append(
-            {"measure": "Is Weakly Connected?", "value": is_weakly_connected(G)}
+            {
+                "measure": "Is Weakly Connected?",
+                "value": is_weakly_connected(G, analysis.components),
+            }
         )
         data.append(
             {"measure": "Is Strongly Connected?", "value": is_strongly_connected(G)}
@@ -116,71 +185,84 @@ def compute_basic_topology(G: nx.Graph or nx.DiGraph, graph) -> list[dict]:
         data.append(
             {
                 "measure": "Number of Weakly Components",
-                "value": count_weakly_connected_components(G),
+                "value": count_weakly_connected_components(G, analysis.components),
             }
         )
 
     return data
 
 
-def map_undirected_degree_centrality(centrality_data: dict) -> list:
-    centrality_data = sorted(
-        centrality_data.items(), key=lambda item: item[1], reverse=True
-    )
-
-    data = []
-
-    for i, (k, v) in enumerate(centrality_data):
-        data.append({"position": i + 1, "node": k, "degree": float_str(v)})
-
-    return data
-
-
-def map_directed_degree_centrality(
-    centrality_data: dict, centrality_data_in: dict, centrality_data_out: dict
-) -> list:
-    centrality_data = sorted(
-        centrality_data.items(), key=lambda item: item[1], reverse=True
-    )
-
-    data = []
-
-    for i, (k, v) in enumerate(centrality_data):
-        d = {
-            "position": i + 1,
-            "node": k,
-            "degree": float_str(v),
-            "in_degree": float_str(centrality_data_in[k]),
-            "out_degree": float_str(centrality_data_out[k]),
-        }
-
-        data.append(d)
+def ranking(data: dict, top: int = None) -> tuple:
+    """The nodes and values of data as arrays, ranked by value.
 
-    return data
+    Nodes of equal value keep their order, like a stable sort. With top, only the
+    top highest ranked nodes are returned, selected without sorting all of them.
+    """
+    nodes, values = np.array(list(data.keys())), np.array(list(data.values()))
 
+    if top is not None and top < len(values):
+        # Everything at least as large as the top-th value, ties included, keeps
+        # the order of a full stable sort when sorted on its own.
+        threshold = -np.partition(-values, top - 1)[top - 1]
+        candidates = np.flatnonzero(values >= threshold)
+        nodes, values = nodes[candidates], values[candidates]
 
-def map_centrality_neighbours(degree_data):
-    degree_data = sorted(degree_data, key=lambda item: item[1], reverse=True)
+    order = np.argsort(-values, kind="stable")[:top]
 
-    data = []
+    return nodes[order], values[order]
 
-    for i, (k, v) in enumerate(degree_data):
-        d = {"position": i + 1, "node": k, "count_neighbours": float_str(v)}
 
-        data.append(d)
+def map_undirected_degree_centrality(centrality_data: dict, top: int = None) -> dict:
+    nodes, values = ranking(centrality_data, top)
 
-    return data
+    return {
+        "position": np.arange(1, len(nodes) + 1),
+        "node": nodes,
+        "degree": values.astype(float),
+    }
 
 
-def map_centrality_data(centrality_data, name):
-    centrality_data = sorted(
-        centrality_data.items(), key=lambda item: item[1], reverse=True
-    )
-
-    data = []
-
-    for i, (k, v) in enumerate(centrality_data):
-        data.append({"position": i + 1, "node": k, f"{name}": float_str(v)})
+def map_directed_degree_centrality(
+    centrality_data: dict,
+    centrality_data_in: dict,
+    centrality_data_out: dict,
+    top: int = None,
+) -> dict:
+    nodes, values = ranking(centrality_data, top)
+
+    return {
+        "position": np.arange(1, len(nodes) + 1),
+        "node": nodes,
+        "degree": values.astype(float),
+        "in_degree": np.array([centrality_data_in[k] for k in nodes.tolist()], float),
+        "out_degree": np.array([centrality_data_out[k] for k in nodes.tolist()], float),
+    }
+
+
+def map_centrality_neighbours(degree_data, top: int = None) -> dict:
+    nodes, values = ranking(dict(degree_data), top)
+
+    return {
+        "position": np.arange(1, len(nodes) + 1),
+        "node": nodes,
+        "count_neighbours": values.astype(float),
+    }
+
+
+def map_centrality_data(centrality_data, name, samples: int = None, top: int = None):
+    """Rank the nodes by their centrality.
+
+    Centralities that were estimated from sampled sources record the number of
+    samples with every row. With top, only the top highest ranked nodes are kept.
+    """
+    nodes, values = ranking(centrality_data, top)
+    data = {
+        "position": np.arange(1, len(nodes) + 1),
+        "node": nodes,
+        f"{name}": values.astype(float),
+    }
+    if samples is not None:
+        data["samples"] = np.full(len(nodes), samples)
 
     return data
 
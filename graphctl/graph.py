@@ -1,7 +1,65 @@
 import csv
+import gzip
+import heapq
+import io
+import random
+import sys
+from contextlib import nullcontext
+from itertools import chain, islice
+from operator import itemgetter
 import networkx as nx
 from networkx.algorithms import community as nxc
 import numpy as np
+import scipy as sp
+import scipy.sparse.csgraph  # noqa: F401
+import scipy.sparse.linalg  # noqa: F401
+from .cache import edges_hash, graph_key, load_cached_graph, save_cached_graph
+from .parallel import cpu_count, map_chunks, map_items, start_pool
+
+
+CHUNK_SIZE = 100_000
+
+# Graphs with fewer nodes are not worth starting worker processes for.
+PARALLEL_MIN_NODES = 1_000
+
+
+def open_input(input: str):
+    """Open a CSV file for reading.
+
+    Gzip compressed files are decompressed on the fly and `-` reads from stdin.
+    """
+    if input == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, newline="")
+
+    with open(input, "rb") as f:
+        magic = f.read(2)
+
+    if magic == b"\x1f\x8b":
+        return gzip.open(input, "rt", newline="")
+
+    return open(input, newline="")
+
+
+def read_edges(input: str, chunk_size: int = CHUNK_SIZE):
+    """Read the edge list of a CSV file in chunks of `(source, target)` tuples.
+
+    The input CSV requires a `source` field and a `target` field to build up the graph.
+    """
+    with open_input(input) as f:
+        # skip blank lines, like csv.DictReader does
+        reader = filter(None, csv.reader(f))
+        header = next(reader, None)
+        if header is None:
+            return
+
+        columns = itemgetter(header.index("source"), header.index("target"))
+
+        while True:
+            chunk = list(map(columns, islice(reader, chunk_size)))
+            if not chunk:
+                break
+
+            yield chunk
 
 
 def from_csv(input: str) -> nx.Graph:
@@ -11,11 +69,8 @@ def from_csv(input: str) -> nx.Graph:
     """
     G = nx.Graph()
 
-    with open(input, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            G.add_nodes_from([row["source"], row["target"]])
-            G.add_edge(row["source"], row["target"])
+    for edges in read_edges(input):
+        G.add_edges_from(edges)
 
     return G
 
@@ -27,27 +82,173 @@ def directed_from_csv(input: str) -> nx.DiGraph:
     """
     G = nx.DiGraph()
 
-    with open(input, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            G.add_nodes_from([row["source"], row["target"]])
-            G.add_edge(row["source"], row["target"])
+    for edges in read_edges(input):
+        G.add_edges_from(edges)
 
     return G
 
 
-def build_graph(input, graph):
+def edge_arrays(input: str) -> tuple:
+    """Read the edge list of a CSV file into node labels and an edge array.
+
+    Every node label is mapped to the position of its first appearance in the
+    input. The edges are returned as an `(m, 2)` array of those positions.
+    """
+    index = {}
+    parts = []
+
+    for edges in read_edges(input):
+        ids = [index.setdefault(node, len(index)) for edge in edges for node in edge]
+        parts.append(np.array(ids, dtype=np.int32).reshape(-1, 2))
+
+    edges = np.concatenate(parts) if parts else np.empty((0, 2), dtype=np.int32)
+
+    return list(index), edges
+
+
+def component_labels(n: int, edges: np.ndarray) -> np.ndarray:
+    """Label every node with its (weakly) connected component.
+
+    The components are found in a single pass over the edge array and numbered
+    by their first node, in the order networkx finds them.
+    """
+    adjacency = sp.sparse.coo_array(
+        (np.ones(len(edges), dtype=np.float32), (edges[:, 0], edges[:, 1])),
+        shape=(n, n),
+    )
+    k, labels = sp.sparse.csgraph.connected_components(adjacency, directed=False)
+
+    first = np.full(k, n)
+    np.minimum.at(first, labels, np.arange(n))
+    rank = np.empty(k, dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(k)
+
+    return rank[labels]
+
+
+def fill_adjacency(
+    adjacency: dict,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    order: np.ndarray,
+    ids: np.ndarray,
+    data: list,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Add the neighbours cols of the nodes rows to the dicts of adjacency.
+
+    Every node gets its neighbours in the given order, each with the edge data
+    dict data[id]. The entries are turned into Python objects a chunk at a time.
+    """
+    counts = np.bincount(rows, minlength=len(adjacency)).tolist()
+    # one key sorts faster than two, order is an edge index
+    sort = np.argsort(rows * np.int64(order.max(initial=0) + 1) + order)
+    cols, ids = cols[sort], ids[sort]
+    del sort
+
+    entries = chain.from_iterable(
+        zip(
+            cols[i : i + chunk_size].tolist(),
+            map(data.__getitem__, ids[i : i + chunk_size].tolist()),
+        )
+        for i in range(0, len(cols), chunk_size)
+    )
+
+    for neighbours, count in zip(adjacency.values(), counts):
+        if count:
+            neighbours.update(islice(entries, count))
+
+
+def add_edge_array(G: nx.Graph or nx.DiGraph, edges: np.ndarray):
+    """Add the edges of an edge array to a graph with the nodes `0..n-1`.
+
+    The adjacency dicts are filled at once instead of edge by edge. The result is
+    the same as that of `add_edges_from`, every node has its neighbours in the
+    order of the first edge to them and both directions of an edge share its
+    data dict.
+    """
+    n = np.int64(len(G))
+    u, v = edges[:, 0], edges[:, 1]
+
+    # the first of every edge, the later ones are duplicates
+    if G.is_directed():
+        _, first = np.unique(u * n + v, return_index=True)
+    else:
+        _, first = np.unique(np.minimum(u, v) * n + np.maximum(u, v), return_index=True)
+
+    a, b = edges[first, 0], edges[first, 1]
+    ids = np.arange(len(first), dtype=np.int32)
+    first = first.astype(np.int32)
+    data = [{} for _ in range(len(first))]
+
+    if G.is_directed():
+        fill_adjacency(G._succ, a, b, first, ids, data)
+        fill_adjacency(G._pred, b, a, first, ids, data)
+        return
+
+    # a self loop is a single entry
+    other = a != b
+    fill_adjacency(
+        G._adj,
+        np.concatenate([a, b[other]]),
+        np.concatenate([b, a[other]]),
+        np.concatenate([first, first[other]]),
+        np.concatenate([ids, ids[other]]),
+        data,
+    )
+
+
+def from_arrays(labels: list, edges: np.ndarray, graph: str) -> nx.Graph or nx.DiGraph:
+    """Populate a graph from node labels and an edge array.
+
+    The nodes of the graph are the integer ids of the labels. The labels
+    themselves are kept in the `labels` graph attribute and are only mapped back
+    when the results are written. The `hash` graph attribute identifies the
+    structure of the graph, e.g. to cache its layout, the `edges` attribute keeps
+    the edge array itself and the `components` attribute the (weakly) connected
+    component of every node.
+    """
+    attrs = {
+        "labels": labels,
+        "hash": edges_hash(edges, graph),
+        "edges": edges,
+        "components": component_labels(len(labels), edges),
+    }
+    G = nx.DiGraph(**attrs) if graph == "directed" else nx.Graph(**attrs)
+
+    G.add_nodes_from(range(len(labels)))
+    add_edge_array(G, edges)
+
+    return G
+
+
+def build_graph(input, graph, cache: bool = True):
+    """Build a graph from a CSV file.
+
+    Parsed graphs are stored in the cache, keyed by the contents of input and
+    the type of graph. Later builds of the same graph load them from there.
+    Reading from stdin always bypasses the cache.
+    """
     assert graph in [
         "directed",
         "undirected",
     ], f"graph type `{graph}` must be either directed or undirected"
 
-    if graph == "undirected":
-        G = from_csv(input)
-    elif graph == "directed":
-        G = directed_from_csv(input)
+    cache = cache and input != "-"
+    cached = None
 
-    return G
+    if cache:
+        key = graph_key(input, graph)
+        cached = load_cached_graph(key)
+
+    if cached is None:
+        labels, edges = edge_arrays(input)
+        if cache:
+            save_cached_graph(key, labels, edges)
+    else:
+        labels, edges = cached
+
+    return from_arrays(labels, edges, graph)
 
 
 def count_nodes(G: nx.Graph or nx.DiGraph) -> int:
@@ -60,9 +261,12 @@ def count_edges(G: nx.Graph or nx.DiGraph) -> int:
     return G.number_of_edges()
 
 
-def avg_node_degree(G: nx.Graph or nx.DiGraph) -> float:
+def avg_node_degree(G: nx.Graph or nx.DiGraph, degree: np.ndarray = None) -> float:
     """Calculate the average node degree of a graph."""
-    return np.mean([d for _, d in G.degree()])
+    if degree is None:
+        degree = [d for _, d in G.degree()]
+
+    return np.mean(degree)
 
 
 def density(G: nx.Graph or nx.DiGraph) -> float:
@@ -70,12 +274,20 @@ def density(G: nx.Graph or nx.DiGraph) -> float:
     return nx.density(G)
 
 
-def is_connected(G: nx.Graph) -> bool:
+def is_connected(G: nx.Graph, components: list = None) -> bool:
     """Returns True if the graph is connected, False otherwise."""
-    return nx.is_connected(G)
+    if components is None:
+        return nx.is_connected(G)
+
+    if len(G) == 0:
+        raise nx.NetworkXPointlessConcept(
+            "Connectivity is undefined for the null graph."
+        )
 
+    return len(components) == 1
 
-def is_weakly_connected(G: nx.DiGraph) -> bool:
+
+def is_weakly_connected(G: nx.DiGraph, components: list = None) -> bool:
     """Test directed graph for weak connectivity.
 
     A directed graph is weakly connected if and only if the graph is connected
@@ -85,7 +297,15 @@ def is_weakly_connected(G: nx.DiGraph) -> bool:
     when we account for directionality), it is by definition weakly connected as
     well.
     """
-    return nx.is_weakly_connected(G)
+    if components is None:
+        return nx.is_weakly_connected(G)
+
+    if len(G) == 0:
+        raise nx.NetworkXPointlessConcept(
+            "Connectivity is undefined for the null graph."
+        )
+
+    return len(components) == 1
 
 
 def is_strongly_connected(G: nx.DiGraph) -> bool:
@@ -97,9 +317,12 @@ def is_strongly_connected(G: nx.DiGraph) -> bool:
     return nx.is_strongly_connected(G)
 
 
-def count_connected_components(G: nx.Graph) -> int:
+def count_connected_components(G: nx.Graph, components: list = None) -> int:
     """Return the number of connected components."""
-    return nx.number_connected_components(G)
+    if components is None:
+        return nx.number_connected_components(G)
+
+    return len(components)
 
 
 def count_strongly_connected_components(G: nx.DiGraph) -> int:
@@ -107,47 +330,160 @@ def count_strongly_connected_components(G: nx.DiGraph) -> int:
     return nx.number_strongly_connected_components(G)
 
 
-def count_weakly_connected_components(G: nx.DiGraph) -> int:
+def count_weakly_connected_components(G: nx.DiGraph, components: list = None) -> int:
     """Return the number of weakly connected components."""
-    return nx.number_weakly_connected_components(G)
+    if components is None:
+        return nx.number_weakly_connected_components(G)
 
+    return len(components)
 
-def clustering(G: nx.Graph or nx.DiGraph):
-    return nx.clustering(G)
 
+def simple_adjacency(G: nx.Graph) -> sp.sparse.csr_array:
+    """The binary adjacency of an undirected graph without self loops, in node
+    order.
+    """
+    edges = G.graph.get("edges")
+
+    if edges is None:
+        A = adjacency_matrix(G).astype(np.int64)
+    else:
+        edges = edges[edges[:, 0] != edges[:, 1]].astype(np.int64)
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        A = sp.sparse.coo_array(
+            (np.ones(len(rows), dtype=np.int64), (rows, cols)), shape=(len(G), len(G))
+        )
+
+    A = A.tocsr()
+    A.setdiag(0)
+    A.eliminate_zeros()
+    A.data[:] = 1
+
+    return A
+
+
+def triangle_counts(G: nx.Graph, chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    """Count the triangles every node of an undirected graph is part of, in node
+    order.
+
+    Every edge is directed from the node of lower to the one of higher degree,
+    so that no node has more than `sqrt(2m)` successors. A triangle `a -> b -> c`
+    is found once from each of its edges `a -> c` and `b -> c`, with two sparse
+    products over chunks of the rows. Self loops are ignored, like networkx does.
+    """
+    A = simple_adjacency(G).tocoo()
+    n = A.shape[0]
+
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), np.bincount(A.row, minlength=n)))] = np.arange(n)
+    forward = rank[A.row] < rank[A.col]
+    L = sp.sparse.csr_array(
+        (A.data[forward], (A.row[forward], A.col[forward])), shape=(n, n)
+    )
+    LT = L.T.tocsr()
+    triangles = np.zeros(n, dtype=np.int64)
+
+    for start in range(0, n, chunk_size):
+        rows = slice(start, start + chunk_size)
+        block = L[rows]
+        # a -> b -> c and a -> c, counted for a and c
+        lowest = (block @ L).multiply(block)
+        triangles[rows] += lowest.sum(axis=1)
+        triangles += lowest.sum(axis=0)
+        # a -> b and a -> c and b -> c, counted for b
+        middle = (LT[rows] @ L).multiply(block)
+        triangles[rows] += middle.sum(axis=1)
+
+    return triangles
+
+
+def simple_degree(G: nx.Graph) -> np.ndarray:
+    """The degree of every node of an undirected graph without its self loop, in
+    node order.
+    """
+    return np.fromiter(
+        (len(neighbours) - (v in neighbours) for v, neighbours in G.adj.items()),
+        dtype=np.int64,
+        count=len(G),
+    )
+
+
+def clustering_coefficients(triangles: np.ndarray, degree: np.ndarray) -> np.ndarray:
+    """The clustering coefficient of every node of an undirected graph.
+
+    The degree must not count self loops, like networkx doesn't.
+    """
+    coefficients = np.zeros(len(triangles))
+    np.divide(
+        2 * triangles, degree * (degree - 1), out=coefficients, where=triangles > 0
+    )
+
+    return coefficients
+
+
+def clustering(G: nx.Graph or nx.DiGraph, triangles: np.ndarray = None) -> dict:
+    """The clustering coefficient of every node.
+
+    For undirected graphs it is derived from the triangles of every node, which
+    are counted with `triangle_counts` unless they are given.
+    """
+    if G.is_directed():
+        return nx.clustering(G)
+
+    if triangles is None:
+        triangles = triangle_counts(G)
+
+    coefficients = clustering_coefficients(triangles, simple_degree(G))
 
-def avg_clustering(G: nx.Graph or nx.DiGraph) -> float:
+    return dict(zip(G, coefficients.tolist()))
+
+
+def avg_clustering(G: nx.Graph or nx.DiGraph, clustering: dict = None) -> float:
     """Compute the average clustering coefficient for the graph G.
 
     The closer the average clustering coefficient is to, the more complete the
     graph will be because there’s just one giant component.
     """
-    return nx.average_clustering(G)
+    if clustering is None and G.is_directed():
+        return nx.average_clustering(G)
+
+    if clustering is None:
+        coefficients = clustering_coefficients(triangle_counts(G), simple_degree(G))
 
+        return coefficients.sum() / len(coefficients)
 
-def count_triangles(G: nx.Graph) -> int:
-    triangles_per_node = list(nx.triangles(G).values())
+    return sum(clustering.values()) / len(clustering)
+
+
+def count_triangles(G: nx.Graph, triangles: np.ndarray = None) -> int:
+    if triangles is None:
+        triangles = triangle_counts(G)
 
     # divide by 3 because each triangle is counted once for each node
-    return sum(triangles_per_node) / 3
+    return triangles.sum() / 3
 
 
-def avg_triangles(G: nx.Graph) -> float:
+def avg_triangles(G: nx.Graph, triangles: np.ndarray = None) -> float:
     """The average number of triangles that a node is a part of."""
-    triangles_per_node = list(nx.triangles(G).values())
+    if triangles is None:
+        triangles = triangle_counts(G)
 
-    return np.mean(triangles_per_node)
+    return np.mean(triangles)
 
 
-def median_triangles(G: nx.Graph) -> float:
+def median_triangles(G: nx.Graph, triangles: np.ndarray = None) -> float:
     """The average number of triangles that a node is a part of."""
-    triangles_per_node = list(nx.triangles(G).values())
+    if triangles is None:
+        triangles = triangle_counts(G)
+
+    return np.median(triangles)
 
-    return np.median(triangles_per_node)
 
+def has_bridges(G: nx.Graph, bridges: list = None) -> bool:
+    if bridges is None:
+        return nx.has_bridges(G)
 
-def has_bridges(G: nx.Graph) -> bool:
-    return nx.has_bridges(G)
+    return len(bridges) > 0
 
 
 def bridges(G: nx.Graph) -> list:
@@ -158,20 +494,59 @@ def local_bridges(G: nx.Graph) -> list:
     return list(nx.local_bridges(G, with_span=False))
 
 
-def count_bridges(G: nx.Graph) -> int:
-    return len(bridges(G))
+def count_bridges(G: nx.Graph, bridges: list = None) -> int:
+    if bridges is None:
+        bridges = list(nx.bridges(G))
+
+    return len(bridges)
+
+
+def count_local_bridges(G: nx.Graph, local_bridges: list = None) -> int:
+    if local_bridges is None:
+        local_bridges = list(nx.local_bridges(G, with_span=False))
+
+    return len(local_bridges)
+
+
+def path_lengths(G: nx.Graph, sources: list) -> tuple:
+    """Run a BFS from every source and reduce it to its eccentricity and its
+    average path length.
 
+    Only a single BFS is held in memory at any time.
+    """
+    order = G.number_of_nodes()
+    eccentricities = []
+    average_path_lengths = []
+
+    for source in sources:
+        lengths = nx.single_source_shortest_path_length(G, source)
+        if len(lengths) != order:
+            raise nx.NetworkXError(
+                "Found infinite path length because the graph is not connected"
+            )
+
+        lengths = list(lengths.values())
+        eccentricities.append(max(lengths))
+        average_path_lengths.append(np.mean(lengths))
+
+    return eccentricities, average_path_lengths
+
+
+def shortest_paths(G: nx.Graph, jobs: int = 1):
+    """Compute the diameter and the average path length of a connected graph.
 
-def count_local_bridges(G: nx.Graph) -> int:
-    return len(local_bridges(G))
+    The BFS sources are split across jobs worker processes. Small graphs are
+    always computed in the current process.
+    """
+    if G.number_of_nodes() < PARALLEL_MIN_NODES:
+        jobs = 1
 
+    diameter = 0
+    average_path_lengths = []
 
-def shortest_paths(G: nx.Graph):
-    shortest_path_lengths = dict(nx.all_pairs_shortest_path_length(G))
-    diameter = max(nx.eccentricity(G, sp=shortest_path_lengths).values())
-    average_path_lengths = [
-        np.mean(list(spl.values())) for spl in shortest_path_lengths.values()
-    ]
+    for eccentricities, averages in map_chunks(path_lengths, G, list(G), jobs):
+        diameter = max([diameter, *eccentricities])
+        average_path_lengths.extend(averages)
 
     return {
         "count_nodes": G.number_of_nodes(),
@@ -181,16 +556,202 @@ def shortest_paths(G: nx.Graph):
     }
 
 
-def stats_components(G: nx.Graph or nx.DiGraph):
-    """Break down the stats of each sub-graph."""
-    data = []
+def diameter_bounds(G: nx.Graph) -> tuple:
+    """Bound the diameter of a connected graph with a double sweep.
 
-    for i, component in enumerate(nx.connected_components(G)):
-        S = G.subgraph(component).copy()
-        paths = shortest_paths(S)
-        paths["id"] = i
+    A BFS from the node with the highest degree finds a peripheral node `a`, a
+    BFS from `a` finds the node `b` farthest from it. The eccentricity of `a` is
+    a lower bound of the diameter, twice the eccentricity of the node in the
+    middle of the path between `a` and `b` is an upper bound.
+    """
+    start = max(G.degree, key=lambda item: item[1])[0]
+    lengths = nx.single_source_shortest_path_length(G, start)
+    a = max(lengths, key=lengths.get)
+
+    lengths_a = nx.single_source_shortest_path_length(G, a)
+    b = max(lengths_a, key=lengths_a.get)
+    lengths_b = nx.single_source_shortest_path_length(G, b)
+
+    distance = lengths_a[b]
+    half = distance // 2
+    middle = next(
+        v for v in lengths_a if lengths_a[v] == half and lengths_b[v] == distance - half
+    )
+    eccentricity = max(nx.single_source_shortest_path_length(G, middle).values())
+
+    lower = max(distance, max(lengths_b.values()), eccentricity)
+    upper = min(2 * eccentricity, 2 * max(lengths.values()))
 
-        data.append(paths)
+    return lower, upper
+
+
+def approximate_shortest_paths(
+    G: nx.Graph, samples: int = 100, seed: int = None, jobs: int = 1
+):
+    """Estimate the diameter and the average path length of a connected graph.
+
+    The diameter is bounded with a double sweep, the average path length is
+    estimated from the BFS of `samples` randomly chosen sources. The confidence
+    is the half-width of the 95% confidence interval of that estimate. Graphs
+    with no more nodes than samples are computed exactly.
+    """
+    n = G.number_of_nodes()
+
+    if n <= samples:
+        paths = shortest_paths(G, jobs)
+        paths["diameter_upper"] = paths["diameter"]
+        paths["average_path_confidence"] = 0.0
+        paths["samples"] = n
+
+        return paths
+
+    sources = random.Random(seed).sample(list(G), samples)
+    if samples < PARALLEL_MIN_NODES:
+        jobs = 1
+
+    lower, upper = diameter_bounds(G)
+    average_path_lengths = []
+
+    for eccentricities, averages in map_chunks(path_lengths, G, sources, jobs):
+        # every BFS tightens the bounds of the diameter
+        lower = max(lower, *eccentricities)
+        upper = min(upper, 2 * min(eccentricities))
+        average_path_lengths.extend(averages)
+
+    # standard error of the sampled mean, corrected for the finite population
+    error = np.std(average_path_lengths, ddof=1) / np.sqrt(samples)
+    error *= np.sqrt((n - samples) / (n - 1))
+
+    return {
+        "count_nodes": n,
+        "count_edges": G.number_of_edges(),
+        "diameter": lower,
+        "diameter_upper": upper,
+        "average_path": np.mean(average_path_lengths),
+        "average_path_confidence": 1.96 * error,
+        "samples": samples,
+    }
+
+
+def tiny_component_paths(S: nx.Graph, samples: int = None):
+    """The paths of a component of one or two nodes, without a BFS."""
+    n = len(S)
+    diameter = n - 1
+    paths = {
+        "count_nodes": n,
+        "count_edges": S.number_of_edges(),
+        "diameter": diameter,
+        # the mean of the distances 0 and 1 from either node
+        "average_path": np.float64(diameter / 2),
+    }
+
+    if samples is not None:
+        paths["diameter_upper"] = diameter
+        paths["average_path_confidence"] = 0.0
+        paths["samples"] = n
+
+    return paths
+
+
+def split_edges(G: nx.Graph, components: list) -> list:
+    """Split the edge array of G by the components, in a single pass.
+
+    Returns a list of `None` if G keeps no edge array or the components are not
+    arrays of nodes.
+    """
+    edges = G.graph.get("edges")
+    if edges is None or not all(isinstance(c, np.ndarray) for c in components):
+        return [None] * len(components)
+
+    if not components:
+        return []
+
+    # edges of nodes outside of the components are sorted into a last part
+    label = np.full(len(G), len(components))
+    label[np.concatenate(components)] = np.repeat(
+        np.arange(len(components)), [len(c) for c in components]
+    )
+    key = label[edges[:, 0]]
+    order = np.argsort(key, kind="stable")
+    counts = np.bincount(key, minlength=len(components) + 1)
+
+    return np.split(edges[order], np.cumsum(counts)[:-1])[:-1]
+
+
+def component_graph(G: nx.Graph, component, edges: np.ndarray = None) -> nx.Graph:
+    """The graph of a component, built from its nodes and its edges.
+
+    Without edges the subgraph of G is copied.
+    """
+    if edges is None:
+        return G.subgraph(component).copy()
+
+    S = nx.Graph()
+    S.add_nodes_from(component.tolist())
+    S.add_edges_from(edges.tolist())
+
+    return S
+
+
+def component_paths(G: nx.Graph, task: tuple):
+    """Compute the paths of a single component of G."""
+    component, edges, samples, seed, jobs = task
+    S = component_graph(G, component, edges)
+
+    if len(S) <= 2:
+        return tiny_component_paths(S, samples)
+
+    if samples is None:
+        return shortest_paths(S, jobs)
+
+    return approximate_shortest_paths(S, samples, seed, jobs)
+
+
+def stats_components(
+    G: nx.Graph or nx.DiGraph,
+    components: list = None,
+    jobs: int = 1,
+    samples: int = None,
+    seed: int = None,
+):
+    """Break down the stats of each sub-graph.
+
+    If samples is given, the paths of every component are approximated from that
+    many BFS sources.
+
+    Components of one or two nodes are answered in closed form. A component that
+    holds at least half of the nodes splits its BFS sources across the jobs,
+    all other components are scheduled onto a pool of jobs worker processes,
+    largest first. Components keep the id of their position in components.
+
+    Components that are arrays of nodes are built from their part of the edge
+    array of G, rather than copied out of G.
+    """
+    if components is None:
+        components = nx.connected_components(G)
+
+    components = list(components)
+    parts = split_edges(G, components)
+    jobs = cpu_count(jobs)
+    data = [None] * len(components)
+    pending = []
+
+    for i, component in enumerate(components):
+        if len(component) <= 2:
+            data[i] = component_paths(G, (component, parts[i], samples, seed, 1))
+        elif jobs > 1 and 2 * len(component) >= len(G):
+            data[i] = component_paths(G, (component, parts[i], samples, seed, jobs))
+        else:
+            pending.append(i)
+
+    pending.sort(key=lambda i: len(components[i]), reverse=True)
+    tasks = [(components[i], parts[i], samples, seed, 1) for i in pending]
+
+    for i, paths in zip(pending, map_items(component_paths, G, tasks, jobs)):
+        data[i] = paths
+
+    for i, paths in enumerate(data):
+        paths["id"] = i
 
     return data
 
@@ -220,19 +781,302 @@ def degree_out_centrality(G: nx.DiGraph) -> dict:
     return nx.out_degree_centrality(G)
 
 
-def betweenness_centrality(G: nx.Graph or nx.DiGraph) -> dict:
-    """Calculate the betweenness centrality of every node in a graph."""
-    return nx.betweenness_centrality(G)
+def betweenness_dependencies(G: nx.Graph or nx.DiGraph, sources: list) -> dict:
+    """Sum the unnormalized Brandes dependencies of every node on sources."""
+    b = nx.betweenness_centrality_subset(G, sources, list(G), normalized=False)
+
+    if not G.is_directed():
+        # undo the halving of undirected graphs, the sum is rescaled at the end
+        b = {v: d * 2 for v, d in b.items()}
+
+    return b
+
+
+def rescale_betweenness(b: dict, n: int, k: int = None) -> dict:
+    """Normalize summed dependencies the way networkx normalizes betweenness."""
+    if n <= 2:
+        return b
+
+    scale = 1 / ((n - 1) * (n - 2))
+    if k is not None:
+        scale = scale * n / k
+
+    return {v: d * scale for v, d in b.items()}
+
+
+def betweenness_centrality(
+    G: nx.Graph or nx.DiGraph, jobs: int = 1, samples: int = None, seed: int = None
+) -> dict:
+    """Calculate the betweenness centrality of every node in a graph.
+
+    With more than one job the sources are split across worker processes, each
+    of them sums the dependencies of its sources and the partial sums are reduced
+    afterwards. The result matches the single process up to floating point
+    rounding.
+
+    If samples is given, betweenness is estimated from that many randomly chosen
+    pivot sources, chosen with seed.
+    """
+    if samples is not None and samples >= len(G):
+        samples = None
+
+    if cpu_count(jobs) == 1 or len(G) < PARALLEL_MIN_NODES:
+        return nx.betweenness_centrality(G, k=samples, seed=seed)
+
+    if samples is None:
+        sources = list(G)
+    else:
+        # the same pivots networkx picks for k and seed
+        sources = random.Random(seed).sample(list(G), samples)
+
+    b = dict.fromkeys(G, 0.0)
+
+    for partial in map_chunks(betweenness_dependencies, G, sources, jobs):
+        for v, d in partial.items():
+            b[v] += d
+
+    return rescale_betweenness(b, len(G), samples)
+
+
+def adaptive_betweenness_centrality(
+    G: nx.Graph or nx.DiGraph,
+    samples: int = 100,
+    seed: int = None,
+    jobs: int = 1,
+    top: int = 100,
+    tolerance: float = 0.1,
+) -> tuple:
+    """Estimate betweenness centrality until the ranking of its top nodes settles.
+
+    Pivot sources are sampled in batches of samples. Sampling stops as soon as a
+    batch changes no more than a share tolerance of the top nodes, or every node
+    has been used as a pivot. Nodes of about the same centrality keep swapping
+    places at the bottom of the top nodes, a tolerance of 0 rarely stops before
+    all pivots are used. Returns the estimate and the number of pivots it is
+    based on.
+    """
+    n = len(G)
+    jobs = cpu_count(jobs) if n >= PARALLEL_MIN_NODES else 1
+
+    pivots = random.Random(seed).sample(list(G), n)
+    b = dict.fromkeys(G, 0.0)
+    used = 0
+    ranking = None
+
+    # one pool for all batches, rather than handing the graph to new workers
+    # for every batch
+    with start_pool(G, jobs) if jobs > 1 else nullcontext() as pool:
+        while used < n:
+            batch = pivots[used : used + samples]
+            for partial in map_chunks(betweenness_dependencies, G, batch, jobs, pool):
+                for v, d in partial.items():
+                    b[v] += d
+            used += len(batch)
+
+            previous = ranking
+            ranking = set(heapq.nlargest(top, b, key=b.get))
+            changed = len(ranking - previous) if previous is not None else None
+            if changed is not None and changed <= tolerance * len(ranking):
+                break
+
+    return rescale_betweenness(b, n, used), used
+
+
+def csr_adjacency(G: nx.Graph or nx.DiGraph, reverse: bool = False) -> tuple:
+    """The `(indptr, indices)` arrays of the CSR adjacency of a graph.
+
+    With reverse, the neighbours of a node are its predecessors.
+    """
+    A = adjacency_matrix(G)
+    if reverse:
+        A = A.T.tocsr()
+
+    return A.indptr, A.indices
+
+
+def neighbours(adjacency: tuple, frontier: np.ndarray) -> np.ndarray:
+    """Gather the neighbours of all nodes of a BFS frontier at once."""
+    indptr, indices = adjacency
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+
+    return indices[offsets + np.arange(counts.sum())]
+
+
+def bfs_levels(adjacency: tuple, source: int, seen: np.ndarray) -> list:
+    """Run a BFS from source and return the nodes of every level.
+
+    The BFS expands whole frontiers with array operations. seen is a scratch
+    buffer of the size of the graph that is reset again before returning.
+    """
+    frontier = np.array([source])
+    seen[source] = True
+    levels = []
+
+    while frontier.size:
+        levels.append(frontier)
+        reached = neighbours(adjacency, frontier)
+        frontier = np.unique(reached[~seen[reached]])
+        seen[frontier] = True
+
+    for level in levels:
+        seen[level] = False
+
+    return levels
+
+
+def closeness(adjacency: tuple, sources: list) -> list:
+    """Compute the Wasserman and Faust improved closeness of every source."""
+    n = len(adjacency[0]) - 1
+    seen = np.zeros(n, dtype=bool)
+    result = []
+
+    for source in sources:
+        levels = bfs_levels(adjacency, source, seen)
+        reachable = sum(len(level) for level in levels)
+        totsp = sum(distance * len(level) for distance, level in enumerate(levels))
+
+        centrality = 0.0
+        if totsp > 0 and n > 1:
+            centrality = (reachable - 1.0) / totsp
+            centrality *= (reachable - 1.0) / (n - 1)
+        result.append(centrality)
+
+    return result
+
+
+def closeness_centrality(G: nx.Graph or nx.DiGraph, jobs: int = 1) -> dict:
+    """Calculate the closeness centrality of every node in a graph.
+
+    Like networkx, closeness of directed graphs uses the inward distance to a
+    node and is normalized as proposed by Wasserman and Faust. The BFS runs over
+    a CSR adjacency and the sources are split across jobs worker processes.
+    """
+    if len(G) < PARALLEL_MIN_NODES:
+        jobs = 1
+
+    adjacency = csr_adjacency(G, reverse=G.is_directed())
+    centrality = []
+
+    for partial in map_chunks(closeness, adjacency, list(range(len(G))), jobs):
+        centrality.extend(partial)
+
+    return dict(zip(G, centrality))
+
+
+def group_nodes(labels: np.ndarray) -> list:
+    """Group the node positions by their label, e.g. their component."""
+    order = np.argsort(labels, kind="stable")
+
+    return np.split(order, np.cumsum(np.bincount(labels))[:-1])
+
+
+def adjacency_matrix(G: nx.Graph or nx.DiGraph) -> sp.sparse.csr_array:
+    """The sparse adjacency matrix of a graph, in node order."""
+    return nx.to_scipy_sparse_array(G, nodelist=list(G), weight=None, dtype=float)
+
+
+def power_iteration(M: sp.sparse.csr_array, x: np.ndarray, max_iter: int, tol: float):
+    """Iterate with `M + I` the way networkx does, vectorized over a sparse matrix.
+
+    Returns None if the iteration does not converge within max_iter.
+    """
+    n = M.shape[0]
+
+    for _ in range(max_iter):
+        xlast = x
+        x = xlast + M @ xlast
+        x = x / (np.linalg.norm(x) or 1)
+        if np.abs(x - xlast).sum() < n * tol:
+            return x
+
+    return None
+
+
+def leading_eigenvector(
+    M: sp.sparse.csr_array, x: np.ndarray, max_iter: int, tol: float
+) -> np.ndarray:
+    """Find the leading eigenvector of M, starting from x.
+
+    Power iteration is tried first. If it does not converge, the eigenvector is
+    solved for with ARPACK instead of giving up. A leading eigenvalue that is
+    repeated, like the one of a directed graph with several cycles that don't
+    reach each other, has no single eigenvector with nonnegative entries, and
+    the solved one is any mix of them. Like networkx, this raises
+    `PowerIterationFailedConvergence` then.
+    """
+    n = M.shape[0]
+    vector = power_iteration(M, x, max_iter, tol)
+
+    if vector is not None:
+        return vector / (np.linalg.norm(vector) or 1)
+
+    if n < 4:
+        values, vectors = np.linalg.eig(M.toarray())
+    else:
+        try:
+            values, vectors = sp.sparse.linalg.eigs(M, k=2, which="LR", v0=x, tol=tol)
+        except sp.sparse.linalg.ArpackNoConvergence:
+            raise nx.PowerIterationFailedConvergence(max_iter)
+
+    order = np.argsort(-values.real)
+    values, vector = values[order], vectors[:, order[0]].real
+    vector /= (np.sign(vector.sum()) or 1) * (np.linalg.norm(vector) or 1)
+
+    repeated = len(values) > 1 and np.isclose(values[0], values[1], rtol=1e-6)
+    if repeated or vector.min() < -np.sqrt(np.finfo(float).eps):
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    return vector
+
+
+def eigenvector_centrality(
+    G: nx.Graph or nx.DiGraph,
+    max_iter: int = 100,
+    tol: float = 1.0e-6,
+    nstart: dict = None,
+    per_component: bool = False,
+) -> dict:
+    """Calculate the eigenvector centrality of every node in a graph.
+
+    The adjacency matrix is built once and iterated on with sparse matrix
+    products. nstart warm starts the iteration, e.g. from a previous result. With
+    per_component, the centrality of every (weakly) connected component is
+    computed on its own and scaled by the square root of its share of the nodes,
+    otherwise the smaller components of a disconnected graph vanish.
+    """
+    if len(G) == 0:
+        raise nx.NetworkXPointlessConcept(
+            "cannot compute centrality for the null graph"
+        )
+
+    # the centrality of a node is the sum over its in-edges
+    M = adjacency_matrix(G).T.tocsr()
+    n = M.shape[0]
+
+    if nstart is None:
+        x = np.ones(n)
+    else:
+        x = np.array([nstart.get(v, 0) for v in G], dtype=float)
+        if not x.any():
+            x = np.ones(n)
+
+    if not per_component:
+        x = leading_eigenvector(M, x / x.sum(), max_iter, tol)
 
+        return dict(zip(G, x.tolist()))
 
-def closeness_centrality(G: nx.Graph or nx.DiGraph) -> dict:
-    """Calculate the closeness centrality of every node in a graph."""
-    return nx.closeness_centrality(G)
+    _, labels = sp.sparse.csgraph.connected_components(M, connection="weak")
+    centrality = np.zeros(n)
 
+    for component in group_nodes(labels):
+        S = M[component][:, component]
+        start = x[component] if x[component].any() else np.ones(len(component))
+        vector = leading_eigenvector(S, start / start.sum(), max_iter, tol)
+        centrality[component] = vector * np.sqrt(len(component) / n)
 
-def eigenvector_centrality(G: nx.Graph or nx.DiGraph) -> dict:
-    """Calculate the eigenvector centrality of every node in a graph."""
-    return nx.eigenvector_centrality(G)
+    return dict(zip(G, centrality.tolist()))
 
 
 def k_clique_communities(G: nx.DiGraph, k: int) -> list:
@@ -1,12 +1,182 @@
 #!/usr/bin/env python3
 import csv
+from importlib.util import find_spec
+from itertools import chain
+from os.path import splitext
+from .utils import float_strs
 
+# numpy is imported by the functions that need it, the CLI imports this module
+# on every run.
 
-def write_to_file(output: str, data: list[dict]):
-    """Serialize data to a CSV and write it to a file at output."""
-    fields = data[0].keys()
+# The number of rows that are formatted and written at once.
+CHUNK_SIZE = 100_000
+
+# The formats tables can be written in, parquet needs pyarrow.
+FORMATS = ["csv", "npz"] + (["parquet"] if find_spec("pyarrow") else [])
+
+
+def with_format(output: str, format: str) -> str:
+    """Swap the `.csv` extension of output for the one of format."""
+    root, ext = splitext(output)
+
+    return f"{root}.{format}" if ext == ".csv" else output
+
+
+def write_to_file(output: str, data, labels: list = None, format: str = "csv"):
+    """Serialize data to a CSV and write it to a file at output.
+
+    Data is either a list or a generator of rows, or a dict of equally long columns
+    that is written with `write_columns`. If labels are given, the node ids in the
+    `node` field are mapped back to their labels. Other formats than CSV are
+    written with `write_binary`.
+    """
+    if format != "csv":
+        return write_binary(with_format(output, format), data, labels, format)
+
+    if isinstance(data, dict):
+        return write_columns(output, data, labels)
+
+    data = iter(data)
+    first = next(data)
+    fields = first.keys()
+    data = chain([first], data)
+
+    if labels is not None and "node" in fields:
+        data = ({**row, "node": labels[row["node"]]} for row in data)
 
     with open(output, "w", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=fields)
         writer.writeheader()
         writer.writerows(data)
+
+
+def format_column(name: str, column, labels: list = None) -> list:
+    """Format a chunk of a column for the CSV writer.
+
+    Floats are formatted like `float_str`, the node ids mapped to their labels.
+    """
+    import numpy as np
+
+    if name == "node" and labels is not None:
+        return [labels[i] for i in column.tolist()]
+
+    if np.issubdtype(column.dtype, np.floating):
+        return float_strs(column.tolist())
+
+    return column.tolist()
+
+
+def write_columns(
+    output: str, columns: dict, labels: list = None, chunk_size: int = CHUNK_SIZE
+):
+    """Write a dict of equally long columns to a CSV at output.
+
+    The rows are formatted and written a chunk at a time, float columns in a
+    batch per chunk, so that the table is never held as rows in memory.
+    """
+    import numpy as np
+
+    columns = {name: np.asarray(column) for name, column in columns.items()}
+    count = min((len(column) for column in columns.values()), default=0)
+
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+
+        for start in range(0, count, chunk_size):
+            cells = [
+                format_column(name, column[start : start + chunk_size], labels)
+                for name, column in columns.items()
+            ]
+            writer.writerows(zip(*cells))
+
+
+def to_columns(data) -> dict:
+    """Turn a list or a generator of rows into a dict of columns."""
+    if isinstance(data, dict):
+        return data
+
+    rows = list(data)
+    fields = rows[0].keys() if rows else []
+
+    return {field: [row[field] for row in rows] for field in fields}
+
+
+def value_kind(value) -> type:
+    """The kind of a value, bool, int, float or else its own type."""
+    import numpy as np
+
+    for kind, types in [(bool, np.bool_), (int, np.integer), (float, np.floating)]:
+        if isinstance(value, (kind, types)):
+            return kind
+
+    return type(value)
+
+
+def typed_column(name: str, column, labels: list = None):
+    """A column as a typed array, with the node ids mapped to their labels.
+
+    Columns of values of mixed kinds, like the bools, counts and averages in the
+    `value` column of the topology, are stored as strings the way they are
+    written to a CSV, rather than numpy turning them all into floats.
+    """
+    import numpy as np
+
+    if name == "node" and labels is not None:
+        return np.array([labels[i] for i in np.asarray(column).tolist()], dtype=str)
+
+    if isinstance(column, list) and len(set(map(value_kind, column))) > 1:
+        return np.array([str(v) for v in column], dtype=str)
+
+    column = np.asarray(column)
+
+    if column.dtype == object:
+        return np.array([str(v) for v in column.tolist()], dtype=str)
+
+    return column
+
+
+def write_binary(output: str, data, labels: list = None, format: str = "npz"):
+    """Write data as typed binary columns to a file at output.
+
+    Data is anything `write_to_file` accepts. The columns load without parsing,
+    with `numpy.load` for npz and with pyarrow or pandas for parquet.
+    """
+    columns = {
+        name: typed_column(name, column, labels)
+        for name, column in to_columns(data).items()
+    }
+
+    if format == "npz":
+        import numpy as np
+
+        # Writing to a file object keeps numpy from appending another extension.
+        with open(output, "wb") as f:
+            np.savez(f, **columns)
+    elif format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table(columns), output)
+    else:
+        raise ValueError(f"Unknown format: {format}")
+
+
+def read_from_file(input: str) -> list[dict]:
+    """Read the rows of a file written by `write_to_file`, in any format."""
+    ext = splitext(input)[1]
+
+    if ext == ".npz":
+        import numpy as np
+
+        with np.load(input) as arrays:
+            columns = {name: arrays[name].tolist() for name in arrays.files}
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        columns = pq.read_table(input).to_pydict()
+    else:
+        with open(input, newline="") as f:
+            return list(csv.DictReader(f))
+
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
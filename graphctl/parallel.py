@@ -0,0 +1,90 @@
+import os
+import threading
+from functools import partial
+from multiprocessing import get_context, get_start_method
+
+
+# The graph that is shared with the worker processes of a pool.
+shared = None
+
+
+def cpu_count(jobs: int) -> int:
+    """The number of worker processes to use, 0 or less uses all cores."""
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+
+    return jobs
+
+
+def context():
+    """The context to start worker processes with.
+
+    Forking a process that runs other threads, like the pipeline does while it
+    waits on its own pool, can deadlock the child, so that pools started then
+    come from a fork server instead. The graph is pickled to their workers.
+    """
+    method = get_start_method()
+
+    if method == "fork" and threading.active_count() > 1:
+        method = "forkserver"
+
+    return get_context(method)
+
+
+def chunks(items: list, n: int) -> list:
+    """Split items into at most n chunks of about the same size."""
+    size = max(1, -(-len(items) // n))
+
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def init_worker(G):
+    global shared
+    shared = G
+
+
+def start_pool(G, processes: int):
+    """Start a pool of worker processes that are handed the graph once."""
+    return context().Pool(processes, initializer=init_worker, initargs=(G,))
+
+
+def call_worker(func, chunk):
+    return func(shared, chunk)
+
+
+def map_chunks(func, G, items: list, jobs: int = 1, pool=None) -> list:
+    """Apply `func(G, chunk)` to chunks of items in a pool of worker processes.
+
+    The graph is handed to every worker once, when the pool starts, rather than
+    with every chunk. A pool from `start_pool` is used instead of starting one,
+    so that many calls share its workers. The results are returned in the order
+    of the chunks. With a single job everything runs in the current process.
+    """
+    jobs = cpu_count(jobs)
+
+    if jobs == 1 or len(items) <= 1:
+        return [func(G, items)]
+
+    # More chunks than workers keep all of them busy until the end.
+    work = [(func, chunk) for chunk in chunks(items, jobs * 4)]
+
+    if pool is not None:
+        return pool.starmap(call_worker, work)
+
+    with start_pool(G, min(jobs, len(work))) as pool:
+        return pool.starmap(call_worker, work)
+
+
+def map_items(func, G, items: list, jobs: int = 1) -> list:
+    """Apply `func(G, item)` to every item in a pool of worker processes.
+
+    Items are handed out one at a time in the order given, put the most
+    expensive ones first. The results are returned in the same order.
+    """
+    jobs = cpu_count(jobs)
+
+    if jobs == 1 or len(items) <= 1:
+        return [func(G, item) for item in items]
+
+    with start_pool(G, min(jobs, len(items))) as pool:
+        return list(pool.imap(partial(call_worker, func), items, chunksize=1))
@@ -0,0 +1,688 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from os.path import join
+import networkx as nx
+from . import parallel
+from .analysis import Analysis
+from .data import (
+    compute_basic_topology,
+    map_centrality_data,
+    map_centrality_neighbours,
+    map_directed_degree_centrality,
+    map_undirected_degree_centrality,
+)
+from .graph import (
+    adaptive_betweenness_centrality,
+    betweenness_centrality,
+    bridges,
+    closeness_centrality,
+    clustering,
+    degree_in_centrality,
+    degree_out_centrality,
+    eigenvector_centrality,
+    local_bridges,
+    stats_components,
+    triangle_counts,
+)
+from .host import write_to_file
+from .parallel import cpu_count, init_worker
+
+
+class Task:
+    """A step of a pipeline that calls `func(G, **inputs)`.
+
+    The inputs map keyword arguments of func to the names of the tasks whose
+    values they receive. Tasks that belong to an output are run when the output
+    is selected, every other task only when a selected task needs its value.
+    """
+
+    def __init__(self, func, inputs: dict = None, output: str = None):
+        self.func = func
+        self.inputs = inputs or {}
+        self.output = output
+
+
+def select(tasks: dict, only=(), skip=()) -> dict:
+    """The tasks needed for the outputs in only, all outputs if it is empty, that
+    are not in skip.
+    """
+    wanted = [
+        name
+        for name, task in tasks.items()
+        if task.output is not None
+        and (not only or task.output in only)
+        and task.output not in skip
+    ]
+    needed = set()
+
+    while wanted:
+        name = wanted.pop()
+        if name not in needed:
+            needed.add(name)
+            wanted.extend(tasks[name].inputs.values())
+
+    return {name: task for name, task in tasks.items() if name in needed}
+
+
+def call_task(func, inputs: dict):
+    return func(parallel.shared, **inputs)
+
+
+def starts_workers(task: Task) -> bool:
+    """Whether a task starts worker processes of its own, for its jobs."""
+    return "jobs" in getattr(task.func, "keywords", {})
+
+
+def input_hash(G: nx.Graph or nx.DiGraph) -> str:
+    """Hash the structure and the node labels of a graph."""
+    h = hashlib.sha256(G.graph["hash"].encode("utf-8"))
+    h.update("\0".join(G.graph["labels"]).encode("utf-8"))
+
+    return h.hexdigest()
+
+
+def parameters(task: Task) -> dict:
+    """The parameters a task was declared with, except for its output files and
+    the options that don't change its results. Values that are not plain scalars
+    are replaced by a hash.
+    """
+    keywords = getattr(task.func, "keywords", {})
+
+    return {
+        key: (
+            value
+            if isinstance(value, (str, int, float, bool, type(None)))
+            else hashlib.sha256(pickle.dumps(value)).hexdigest()
+        )
+        for key, value in sorted(keywords.items())
+        if key not in ["jobs", "cache"] and key not in outputs(task)
+    }
+
+
+def outputs(task: Task) -> dict:
+    """The files a task writes by the keyword argument that names them."""
+    keywords = getattr(task.func, "keywords", {})
+
+    return {
+        key: value
+        for key, value in keywords.items()
+        if key == "output" or key.endswith("_output")
+    }
+
+
+def write_atomic(path: str, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_manifest(directory: str, manifest: dict):
+    write_atomic(
+        join(directory, "manifest.json"),
+        json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+    )
+
+
+def forget(directory: str, files: list):
+    """Drop the tasks that wrote any of files from the manifest in directory.
+
+    Commands that replace files of a pipeline outside of it call this first, so
+    that a resumed pipeline writes them again instead of taking them as finished.
+    Tasks recorded without their files are dropped as well.
+    """
+    try:
+        with open(join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    names = {os.path.basename(path) for path in files}
+    manifest["tasks"] = {
+        name: task
+        for name, task in manifest.get("tasks", {}).items()
+        if "outputs" in task and not names.intersection(task["outputs"])
+    }
+    write_manifest(directory, manifest)
+
+
+class Checkpoint:
+    """The finished tasks of a pipeline, recorded in a directory.
+
+    A `manifest.json` records a hash of the input graph and, for every finished
+    task, its parameters, the files it wrote and a key over the input, the
+    parameters and the keys of the tasks it depends on. Values of tasks without an output are pickled into
+    `.checkpoints`. A task counts as finished as long as its key is unchanged and
+    its files are still there. Without resume, every task counts as unfinished.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        G: nx.Graph or nx.DiGraph,
+        tasks: dict,
+        resume: bool = True,
+    ):
+        self.directory = directory
+        self.tasks = tasks
+        self.input = input_hash(G)
+        self.keys = {}
+
+        for name in tasks:
+            self.key(name)
+
+        try:
+            with open(join(directory, "manifest.json")) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+        self.finished = (
+            manifest.get("tasks", {})
+            if resume and manifest.get("input") == self.input
+            else {}
+        )
+
+    def key(self, name: str) -> str:
+        if name not in self.keys:
+            task = self.tasks[name]
+            description = {
+                "input": self.input,
+                "task": name,
+                "parameters": parameters(task),
+                "inputs": {key: self.key(dep) for key, dep in task.inputs.items()},
+            }
+            self.keys[name] = hashlib.sha256(
+                json.dumps(description, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+
+        return self.keys[name]
+
+    def path(self, name: str) -> str:
+        return join(self.directory, ".checkpoints", f"{name}.pickle")
+
+    def done(self, name: str) -> bool:
+        """Whether a task finished with the same key and its files are there."""
+        task = self.tasks[name]
+        files = outputs(task).values() if task.output else [self.path(name)]
+
+        return self.finished.get(name, {}).get("key") == self.keys[name] and all(
+            os.path.exists(path) for path in files
+        )
+
+    def load(self, name: str):
+        with open(self.path(name), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, name: str, value):
+        """Record a finished task and store its value if it has no output."""
+        if self.tasks[name].output is None:
+            os.makedirs(join(self.directory, ".checkpoints"), exist_ok=True)
+            write_atomic(self.path(name), pickle.dumps(value))
+
+        self.finished[name] = {
+            "key": self.keys[name],
+            "parameters": parameters(self.tasks[name]),
+            "outputs": sorted(
+                os.path.basename(path) for path in outputs(self.tasks[name]).values()
+            ),
+        }
+        write_manifest(self.directory, {"input": self.input, "tasks": self.finished})
+
+
+def resume(tasks: dict, checkpoint: Checkpoint) -> tuple:
+    """Split tasks into the ones still to run and the values of finished tasks
+    they depend on.
+    """
+    todo, values = {}, {}
+    wanted = [name for name, task in tasks.items() if task.output is not None]
+
+    while wanted:
+        name = wanted.pop()
+        if name in todo or name in values:
+            continue
+        if checkpoint.done(name):
+            if tasks[name].output is None:
+                values[name] = checkpoint.load(name)
+            continue
+
+        todo[name] = tasks[name]
+        wanted.extend(tasks[name].inputs.values())
+
+    return {name: task for name, task in tasks.items() if name in todo}, values
+
+
+def run(
+    G: nx.Graph or nx.DiGraph,
+    tasks: dict,
+    jobs: int = 1,
+    checkpoint: Checkpoint = None,
+) -> dict:
+    """Run every task as soon as the tasks it depends on are done.
+
+    Independent tasks run concurrently in a pool of worker processes, which get
+    the graph once, when the pool starts. Tasks that start worker processes of
+    their own run one at a time in the current process instead, each with all of
+    the jobs, and only one other task runs next to them, so that no more than
+    jobs + 1 processes are busy at once. Their pools start from a fork server, as
+    this process runs the threads of its own pool by then. The values of the tasks
+    are returned by name. With a single job the tasks run one after the other in
+    the order given, every task right after the tasks it depends on.
+
+    With a checkpoint, tasks that finished in a previous run are skipped and every
+    task is recorded as soon as it finishes. If a task fails, the tasks that are
+    running already are finished and recorded before the error is raised.
+    """
+    values = {}
+
+    if checkpoint is not None:
+        tasks, values = resume(tasks, checkpoint)
+
+    def finish(name, value):
+        values[name] = value
+        if checkpoint is not None:
+            checkpoint.save(name, value)
+
+    if cpu_count(jobs) == 1:
+
+        def resolve(name):
+            if name not in values:
+                task = tasks[name]
+                inputs = {key: resolve(dep) for key, dep in task.inputs.items()}
+                finish(name, task.func(G, **inputs))
+
+            return values[name]
+
+        for name in tasks:
+            resolve(name)
+
+        return values
+
+    pending = dict(tasks)
+    error = None
+
+    def ready():
+        return [
+            name
+            for name, task in pending.items()
+            if all(dependency in values for dependency in task.inputs.values())
+        ]
+
+    def take(name):
+        task = pending.pop(name)
+
+        return task.func, {key: values[dep] for key, dep in task.inputs.items()}
+
+    with ProcessPoolExecutor(
+        cpu_count(jobs), initializer=init_worker, initargs=(G,)
+    ) as pool:
+        running = {}
+
+        while (pending and error is None) or running:
+            if error is None:
+                names = ready()
+                heavy = [name for name in names if starts_workers(tasks[name])]
+
+                limit = 1 if heavy else cpu_count(jobs)
+                for name in names:
+                    if len(running) >= limit:
+                        break
+                    if not starts_workers(tasks[name]):
+                        running[pool.submit(call_task, *take(name))] = name
+
+                # a task that starts workers waits for the pool to drain, then
+                # runs on this thread, as forking from another one can deadlock
+                if heavy and len(running) <= 1:
+                    func, inputs = take(heavy[0])
+                    try:
+                        finish(heavy[0], func(G, **inputs))
+                    except Exception as e:
+                        error = e
+                    continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    finish(name, future.result())
+                except Exception as e:
+                    error = error or e
+
+    if error is not None:
+        raise error
+
+    return values
+
+
+def compute_betweenness(
+    G, jobs, samples, adaptive, adaptive_top, seed, adaptive_tolerance=0.1
+):
+    """Compute betweenness centrality, exactly or estimated from samples.
+
+    Returns the centrality and the number of pivots it was estimated from, which
+    is None for the exact centrality.
+    """
+    if adaptive:
+        return adaptive_betweenness_centrality(
+            G, samples or 100, seed, jobs, adaptive_top, adaptive_tolerance
+        )
+
+    if samples is not None and samples >= len(G):
+        samples = None
+
+    return betweenness_centrality(G, jobs, samples, seed), samples
+
+
+def compute_degree(G, graph):
+    return Analysis(G, graph).degree
+
+
+def compute_degree_centrality(G, graph, degree):
+    return Analysis(G, graph, degree=degree).degree_centrality
+
+
+def compute_layout(G, iterations, seed, cache, method):
+    from .plot import layout
+
+    return layout(G, iterations, seed, cache, method)
+
+
+def first(G, value):
+    return value[0]
+
+
+def write_topology(
+    G,
+    graph,
+    jobs,
+    samples,
+    seed,
+    output,
+    output_format="csv",
+    state_output=None,
+    component_stats=None,
+    **intermediates,
+):
+    """Write the basic topology of G, and the state `update` continues from."""
+    analysis = Analysis(G, graph, **intermediates)
+
+    if state_output is not None and component_stats is None:
+        component_stats = stats_components(G, analysis.components, jobs, samples, seed)
+
+    data = compute_basic_topology(
+        G, graph, analysis, jobs, samples, seed, component_stats
+    )
+    write_to_file(output, data, format=output_format)
+
+    if state_output is not None:
+        from .state import save_state
+
+        save_state(state_output, G, analysis, component_stats, samples, seed)
+
+
+def write_degree(
+    G,
+    graph,
+    output,
+    neighbours_output,
+    degree,
+    centrality,
+    top=None,
+    output_format="csv",
+):
+    if graph == "undirected":
+        data = map_undirected_degree_centrality(centrality, top)
+    elif graph == "directed":
+        data = map_directed_degree_centrality(
+            centrality, degree_in_centrality(G), degree_out_centrality(G), top
+        )
+
+    write_to_file(output, data, G.graph["labels"], output_format)
+    write_to_file(
+        neighbours_output,
+        map_centrality_neighbours(zip(G, degree.tolist()), top),
+        G.graph["labels"],
+        output_format,
+    )
+
+
+def write_centrality(
+    G, name, output, centrality, samples=None, top=None, output_format="csv"
+):
+    data = map_centrality_data(centrality, name, samples, top)
+
+    write_to_file(output, data, G.graph["labels"], output_format)
+
+
+def write_betweenness(G, output, estimate, top=None, output_format="csv"):
+    write_centrality(
+        G, "betweenness", output, *estimate, top=top, output_format=output_format
+    )
+
+
+def plot_graph(G, output, renderer, pos, bridges=None, local_bridges=None):
+    from .plot import render_bridges, render_graph
+
+    if bridges is None:
+        render_graph(G, output, pos=pos, renderer=renderer)
+    else:
+        render_bridges(
+            G,
+            output,
+            bridges=bridges,
+            local_bridges=local_bridges,
+            pos=pos,
+            renderer=renderer,
+        )
+
+
+def plot_centrality(G, output, renderer, size_multiplier, pos, centrality):
+    from .plot import render_centrality_graph
+
+    render_centrality_graph(
+        G,
+        centrality,
+        output,
+        size_multiplier=size_multiplier,
+        pos=pos,
+        renderer=renderer,
+    )
+
+
+def plot_distribution(G, output, title, data):
+    from .plot import render_centrality_distribution
+
+    render_centrality_distribution(data, output, title=title)
+
+
+def all_tasks(
+    graph: str,
+    outdir: str,
+    jobs: int = 1,
+    path_samples: int = None,
+    samples: int = None,
+    adaptive: bool = False,
+    adaptive_top: int = 100,
+    adaptive_tolerance: float = 0.1,
+    seed: int = None,
+    iterations: int = 15,
+    layout_method: str = "spring",
+    renderer: str = "default",
+    tolerance: float = 1e-6,
+    max_iter: int = 100,
+    nstart: dict = None,
+    per_component: bool = False,
+    top: int = None,
+    output_format: str = "csv",
+    cache: bool = True,
+) -> dict:
+    """The tasks of the `all` command, writing every table and plot to outdir.
+
+    The tables are written in output_format, with its extension.
+    """
+    ext = output_format
+    tasks = {
+        "degree": Task(partial(compute_degree, graph=graph)),
+        "degree_centrality": Task(
+            partial(compute_degree_centrality, graph=graph), {"degree": "degree"}
+        ),
+        "layout": Task(
+            partial(
+                compute_layout,
+                iterations=iterations,
+                seed=seed,
+                cache=cache,
+                method=layout_method,
+            )
+        ),
+        "betweenness": Task(
+            partial(
+                compute_betweenness,
+                jobs=jobs,
+                samples=samples,
+                adaptive=adaptive,
+                adaptive_top=adaptive_top,
+                adaptive_tolerance=adaptive_tolerance,
+                seed=seed,
+            )
+        ),
+        "betweenness_centrality": Task(first, {"value": "betweenness"}),
+        "eigenvector": Task(
+            partial(
+                eigenvector_centrality,
+                max_iter=max_iter,
+                tol=tolerance,
+                nstart=nstart,
+                per_component=per_component,
+            )
+        ),
+        "closeness": Task(partial(closeness_centrality, jobs=jobs)),
+    }
+    topology_inputs = {"degree": "degree", "clustering": "clustering"}
+
+    if graph == "undirected":
+        # the triangle rows of the topology and the clustering share one count
+        tasks["triangles"] = Task(triangle_counts)
+        tasks["clustering"] = Task(clustering, {"triangles": "triangles"})
+        tasks["bridges"] = Task(bridges)
+        tasks["local_bridges"] = Task(local_bridges)
+        topology_inputs.update(
+            triangles="triangles", bridges="bridges", local_bridges="local_bridges"
+        )
+    else:
+        tasks["clustering"] = Task(clustering)
+
+    # only undirected graphs have a state to update, and every output of a task
+    # has to be a file
+    state = {"state_output": join(outdir, "state.npz")} if graph == "undirected" else {}
+    tasks[f"topology.{ext}"] = Task(
+        partial(
+            write_topology,
+            graph=graph,
+            jobs=jobs,
+            samples=path_samples,
+            seed=seed,
+            output=join(outdir, f"topology.{ext}"),
+            output_format=output_format,
+            **state,
+        ),
+        topology_inputs,
+        "topology",
+    )
+    tasks["graph.png"] = Task(
+        partial(plot_graph, output=join(outdir, "graph.png"), renderer=renderer),
+        {"pos": "layout"},
+        "graph",
+    )
+
+    if graph == "undirected":
+        tasks["bridges.png"] = Task(
+            partial(plot_graph, output=join(outdir, "bridges.png"), renderer=renderer),
+            {"pos": "layout", "bridges": "bridges", "local_bridges": "local_bridges"},
+            "bridges",
+        )
+
+    tasks[f"centrality-degree.{ext}"] = Task(
+        partial(
+            write_degree,
+            graph=graph,
+            output=join(outdir, f"centrality-degree.{ext}"),
+            neighbours_output=join(outdir, f"centrality-degree-neighbours.{ext}"),
+            top=top,
+            output_format=output_format,
+        ),
+        {"degree": "degree", "centrality": "degree_centrality"},
+        "degree",
+    )
+    centralities = [
+        ("degree", "degree_centrality", 1000),
+        ("betweenness", "betweenness_centrality", 1200),
+        ("eigenvector", "eigenvector", 4000),
+        ("closeness", "closeness", 50),
+    ]
+
+    for name, centrality, size_multiplier in centralities:
+        if name == "betweenness":
+            tasks[f"centrality-betweenness.{ext}"] = Task(
+                partial(
+                    write_betweenness,
+                    output=join(outdir, f"centrality-betweenness.{ext}"),
+                    top=top,
+                    output_format=output_format,
+                ),
+                {"estimate": "betweenness"},
+                name,
+            )
+        elif name != "degree":
+            tasks[f"centrality-{name}.{ext}"] = Task(
+                partial(
+                    write_centrality,
+                    name=name,
+                    output=join(outdir, f"centrality-{name}.{ext}"),
+                    top=top,
+                    output_format=output_format,
+                ),
+                {"centrality": name},
+                name,
+            )
+
+        tasks[f"{name}-centrality.png"] = Task(
+            partial(
+                plot_centrality,
+                output=join(outdir, f"{name}-centrality.png"),
+                renderer=renderer,
+                size_multiplier=size_multiplier,
+            ),
+            {"pos": "layout", "centrality": centrality},
+            name,
+        )
+        tasks[f"{name}-centrality-distribution.png"] = Task(
+            partial(
+                plot_distribution,
+                output=join(outdir, f"{name}-centrality-distribution.png"),
+                title=f"{name.capitalize()} Centrality Histogram",
+            ),
+            {"data": centrality},
+            name,
+        )
+
+    tasks["clustering-distribution.png"] = Task(
+        partial(
+            plot_distribution,
+            output=join(outdir, "clustering-distribution.png"),
+            title="Clustering Histogram",
+        ),
+        {"data": "clustering"},
+        "clustering",
+    )
+
+    return tasks
@@ -1,24 +1,329 @@
 import networkx as nx
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import numpy as np
-from .graph import bridges, local_bridges
 from random import randint
+from contextlib import contextmanager
+from .cache import load_cached_layout, save_cached_layout
+from .utils import LAYOUTS, RENDERERS  # noqa: F401
 
+# Plots are only ever written to files, also from worker processes.
+matplotlib.use("Agg")
 
-def render_graph(G: nx.Graph or nx.DiGraph, output, iterations: int = 15):
-    rnd = np.random.RandomState()
-    pos = nx.spring_layout(G, iterations=iterations, seed=rnd)
-    fig, ax = plt.subplots(figsize=(15, 9))
-    ax.axis("off")
-    plot_options = {"node_size": 10, "with_labels": False, "width": 0.15}
-    nx.draw_networkx(G, pos=pos, ax=ax, **plot_options)
 
-    plt.tight_layout()
-    plt.savefig(output, format="PNG", bbox_inches="tight", dpi=300)
+def coarsen(n: int, u: np.ndarray, v: np.ndarray, rng) -> tuple:
+    """Collapse every node into the neighbour with the lowest random priority.
+
+    Returns the cluster of every node, the number of clusters and the edges
+    between the clusters.
+    """
+    priority = rng.permutation(n)
+    best = priority.copy()
+    np.minimum.at(best, u, priority[v])
+    np.minimum.at(best, v, priority[u])
+
+    _, cluster = np.unique(best, return_inverse=True)
+    cu, cv = cluster[u], cluster[v]
+    keep = cu != cv
+    edges = np.unique(np.sort(np.stack([cu[keep], cv[keep]], axis=1), axis=1), axis=0)
+
+    return cluster, cluster.max() + 1, edges[:, 0], edges[:, 1]
+
+
+def repulsion(pos: np.ndarray, k: float) -> np.ndarray:
+    """Approximate the repulsive forces between all nodes, Barnes-Hut style.
+
+    Nodes are binned into a hierarchy of grids. On every level a node is pushed
+    away from the centers of mass of the cells that are well separated from its
+    own cell but whose parents are adjacent to its parent, on the finest level
+    also from the cells next to its own. Every pair of nodes is accounted for
+    once, at a cost linear in the number of nodes per level.
+    """
+    n = len(pos)
+    lo = pos.min(axis=0)
+    span = (pos.max(axis=0) - lo).max() or 1.0
+    depth = int(min(10, max(2, np.ceil(np.log(max(n, 16)) / np.log(4)))))
+    force = np.zeros_like(pos)
+
+    def push(mask, mass, center):
+        delta = pos[mask] - center
+        dist2 = (delta**2).sum(axis=1) + 1e-9
+        force[mask] += delta * (k * k * mass / dist2)[:, None]
+
+    for level in range(2, depth + 1):
+        g = 2**level
+        cell = np.minimum(((pos - lo) / span * g).astype(np.int64), g - 1)
+        cid = cell[:, 0] * g + cell[:, 1]
+        mass = np.bincount(cid, minlength=g * g)
+        total = np.stack(
+            [np.bincount(cid, pos[:, i], minlength=g * g) for i in range(2)], axis=1
+        )
+        center = total / np.maximum(mass, 1)[:, None]
+        parent = cell // 2
+
+        for a, b, c, d in np.ndindex(3, 3, 2, 2):
+            tx = 2 * (parent[:, 0] + a - 1) + c
+            ty = 2 * (parent[:, 1] + b - 1) + d
+            mask = (tx >= 0) & (tx < g) & (ty >= 0) & (ty < g)
+            mask &= (np.abs(tx - cell[:, 0]) > 1) | (np.abs(ty - cell[:, 1]) > 1)
+            target = tx[mask] * g + ty[mask]
+            push(mask, mass[target], center[target])
+
+        if level < depth:
+            continue
+
+        for a, b in np.ndindex(3, 3):
+            tx, ty = cell[:, 0] + a - 1, cell[:, 1] + b - 1
+            mask = (tx >= 0) & (tx < g) & (ty >= 0) & (ty < g)
+            target = tx * g + ty
+            m = mass[np.where(mask, target, 0)]
+            if a == 1 and b == 1:
+                # leave the node itself out of its own cell
+                m = m - 1
+                mask &= m > 0
+                own = (total[cid] - pos)[mask] / m[mask][:, None]
+                push(mask, m[mask], own)
+            else:
+                push(mask, mass[target[mask]], center[target[mask]])
+
+    return force
+
+
+def refine(pos, u, v, iterations, temperature, k) -> np.ndarray:
+    """Move the nodes along their forces with a cooling temperature."""
+    for i in range(iterations):
+        force = repulsion(pos, k)
+        delta = pos[u] - pos[v]
+        attraction = delta * (np.sqrt((delta**2).sum(axis=1)) / k)[:, None]
+        for axis in range(2):
+            force[:, axis] -= np.bincount(u, attraction[:, axis], len(pos))
+            force[:, axis] += np.bincount(v, attraction[:, axis], len(pos))
+
+        length = np.sqrt((force**2).sum(axis=1)) + 1e-9
+        step = temperature * (1 - i / iterations)
+        pos = pos + force * (np.minimum(length, step) / length)[:, None]
+
+    return pos
+
+
+def multilevel_layout(
+    G: nx.Graph or nx.DiGraph, iterations: int = 15, seed: int = None
+) -> dict:
+    """Compute a force-directed layout of a graph on a hierarchy of coarsened
+    graphs.
+
+    The graph is coarsened until only a few nodes are left. Their layout is
+    refined level by level, every node starting from the position of its cluster,
+    with repulsion approximated by `repulsion`. The time of an iteration grows
+    close to linearly with the size of the graph.
+    """
+    rng = np.random.default_rng(seed)
+    A = nx.to_scipy_sparse_array(G, nodelist=list(G), weight=None, format="coo")
+    keep = A.row != A.col
+    u, v = A.row[keep], A.col[keep]
+
+    levels = []
+    n = len(G)
+    while n > 64:
+        cluster, size, cu, cv = coarsen(n, u, v, rng)
+        if size > 0.9 * n:
+            break
+        levels.append((n, u, v, cluster))
+        n, u, v = size, cu, cv
+
+    k = 1.0
+    pos = rng.uniform(0, np.sqrt(n) * k, (n, 2))
+    pos = refine(pos, u, v, iterations * 4, np.sqrt(n) * k / 10, k)
+
+    for n, u, v, cluster in reversed(levels):
+        pos = pos[cluster] + rng.normal(0, k / 10, (n, 2))
+        pos = refine(pos, u, v, iterations, k * 2, k)
+
+    pos = nx.rescale_layout(pos) if len(pos) > 1 else np.zeros_like(pos)
+
+    return dict(zip(G, pos))
+
+
+def layout(
+    G: nx.Graph or nx.DiGraph,
+    iterations: int = 15,
+    seed: int = None,
+    cache=True,
+    method: str = "spring",
+) -> dict:
+    """Compute the layout of a graph with a spring or multilevel layout method.
+
+    Layouts with a seed are stored in the cache, keyed by the structure of the
+    graph, the method, the number of iterations and the seed, and loaded from
+    there again. Compute a layout once and hand it to every renderer to line up
+    their images.
+    """
+    assert method in LAYOUTS, f"layout `{method}` must be one of {LAYOUTS}"
+
+    cache = cache and seed is not None and "hash" in G.graph
+    key = f"{G.graph.get('hash')}-{method}-{iterations}-{seed}"
+
+    positions = load_cached_layout(key) if cache else None
+    if positions is not None and len(positions) == len(G):
+        return dict(zip(G, positions))
+
+    if method == "multilevel":
+        pos = multilevel_layout(G, iterations, seed)
+    else:
+        pos = nx.spring_layout(G, iterations=iterations, seed=seed)
+
+    if cache:
+        save_cached_layout(key, np.array([pos[v] for v in G]).reshape(-1, 2))
+
+    return pos
+
+
+def positions(G: nx.Graph or nx.DiGraph, pos: dict) -> tuple:
+    """The positions of the nodes as an array and the row of every node."""
+    index = {v: i for i, v in enumerate(G)}
+
+    return np.array([pos[v] for v in G]).reshape(-1, 2), index
+
+
+def draw_edges_fast(xy, index, edges, ax, width=0.15, color="k"):
+    """Draw edges as a single line collection."""
+    edges = np.array([(index[u], index[v]) for u, v in edges], dtype=np.int64)
+    if len(edges) == 0:
+        return
+
+    lines = LineCollection(xy[edges], linewidths=width, colors=color, zorder=1)
+    ax.add_collection(lines)
+
+
+def rasterize_edges(xy, edges, extent, shape, chunk_size=4_000_000) -> np.ndarray:
+    """Count how many edges cross every pixel of an image.
+
+    Every edge is sampled once per pixel along its length and the samples are
+    binned into the pixels, a chunk of samples at a time.
+    """
+    (x0, x1, y0, y1), (width, height) = extent, shape
+    scale = np.array([(width - 1) / (x1 - x0), (height - 1) / (y1 - y0)])
+    start = ((xy[edges[:, 0]] - (x0, y0)) * scale).astype(np.float32)
+    delta = ((xy[edges[:, 1]] - (x0, y0)) * scale).astype(np.float32) - start
+    steps = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+
+    density = np.zeros(width * height, dtype=np.int64)
+    cumulative = np.cumsum(steps)
+    bounds = np.unique(
+        np.searchsorted(cumulative, np.arange(0, cumulative[-1], chunk_size), "right")
+    )
+
+    for lo, hi in zip(bounds, [*bounds[1:], len(edges)]):
+        edge = np.repeat(np.arange(lo, hi), steps[lo:hi])
+        offset = np.arange(len(edge)) - np.repeat(
+            np.cumsum(steps[lo:hi]) - steps[lo:hi], steps[lo:hi]
+        )
+        t = (offset / np.maximum(steps[edge] - 1, 1)).astype(np.float32)
+        x = np.rint(start[edge, 0] + delta[edge, 0] * t).astype(np.int64)
+        y = np.rint(start[edge, 1] + delta[edge, 1] * t).astype(np.int64)
+        density += np.bincount(y * width + x, minlength=width * height)
+
+    return density.reshape(height, width)
+
+
+def draw_fast(
+    G: nx.Graph or nx.DiGraph,
+    pos: dict,
+    ax,
+    node_size=10,
+    node_color="#1f77b4",
+    width=0.15,
+    dpi=300,
+):
+    """Draw a graph with the edges rasterized into a single image and the nodes as
+    a single scatter, instead of an artist per node and edge. Edges of directed
+    graphs are drawn without arrows.
+    """
+    xy, index = positions(G, pos)
+    if len(xy) == 0:
+        return xy, index
+
+    edges = np.fromiter(
+        (i for u, v in G.edges() for i in (index[u], index[v])), dtype=np.int64
+    ).reshape(-1, 2)
+
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    margin = np.maximum((hi - lo) * 0.01, 1e-3)
+    extent = (
+        lo[0] - margin[0],
+        hi[0] + margin[0],
+        lo[1] - margin[1],
+        hi[1] + margin[1],
+    )
+    size = ax.figure.get_size_inches() * ax.get_position().size
+    shape = (size * dpi).astype(int)
+
+    if len(edges):
+        density = rasterize_edges(xy, edges, extent, shape)
+        # overlapping edges darken a pixel like overlapping translucent lines
+        opacity = min(1.0, width * dpi / 72)
+        image = np.zeros((*density.shape, 4), dtype=np.uint8)
+        image[..., 3] = np.rint(255 * (1 - (1 - opacity) ** density))
+        ax.imshow(
+            image,
+            extent=extent,
+            origin="lower",
+            aspect="auto",
+            zorder=1,
+        )
+
+    ax.scatter(xy[:, 0], xy[:, 1], s=node_size, c=node_color, zorder=2)
+    ax.set_xlim(extent[:2])
+    ax.set_ylim(extent[2:])
+
+    return xy, index
+
+
+@contextmanager
+def figure(output, figsize=(15, 8)):
+    """Draw on the axes of a figure and save it to output as PNG.
+
+    Every plot draws on the same figure, cleared once the plot is saved, so that
+    only one figure stays alive and its canvas is reused from plot to plot.
+    """
+    fig = plt.figure(num="graphctl", clear=True)
+    fig.set_size_inches(figsize)
+
+    try:
+        yield fig.add_subplot()
+
+        fig.tight_layout()
+        fig.savefig(output, format="PNG", bbox_inches="tight", dpi=300)
+    finally:
+        fig.clear()
+
+
+def render_graph(
+    G: nx.Graph or nx.DiGraph,
+    output,
+    iterations: int = 15,
+    pos: dict = None,
+    renderer: str = "default",
+):
+    if pos is None:
+        pos = layout(G, iterations)
+    with figure(output, (15, 9)) as ax:
+        ax.axis("off")
+        if renderer == "fast":
+            draw_fast(G, pos, ax)
+        else:
+            plot_options = {"node_size": 10, "with_labels": False, "width": 0.15}
+            nx.draw_networkx(G, pos=pos, ax=ax, **plot_options)
 
 
 def render_community(
-    G: nx.Graph or nx.DiGraph, community_data, output, iterations: int = 15
+    G: nx.Graph or nx.DiGraph,
+    community_data,
+    output,
+    iterations: int = 15,
+    pos: dict = None,
+    renderer: str = "default",
 ):
     nodes = {}
 
@@ -31,35 +336,61 @@ def render_community(
 
     colors = [nodes[node] for node in G.nodes()]
 
-    rnd = np.random.RandomState()
-    pos = nx.spring_layout(G, iterations=iterations, seed=rnd)
-    fig, ax = plt.subplots(figsize=(15, 9))
-    ax.axis("off")
-    nx.draw_networkx(
-        G, pos=pos, node_size=10, with_labels=False, width=0.15, node_color=colors
-    )
+    if pos is None:
+        pos = layout(G, iterations)
+    with figure(output, (15, 9)) as ax:
+        ax.axis("off")
+        if renderer == "fast":
+            draw_fast(G, pos, ax, node_color=colors)
+        else:
+            nx.draw_networkx(
+                G,
+                pos=pos,
+                ax=ax,
+                node_size=10,
+                with_labels=False,
+                width=0.15,
+                node_color=colors,
+            )
 
-    plt.tight_layout()
-    plt.savefig(output, format="PNG", bbox_inches="tight", dpi=300)
 
+def render_bridges(
+    G: nx.Graph,
+    output,
+    iterations: int = 15,
+    bridges: list = None,
+    local_bridges: list = None,
+    pos: dict = None,
+    renderer: str = "default",
+):
+    if bridges is None:
+        bridges = list(nx.bridges(G))
+    if local_bridges is None:
+        local_bridges = list(nx.local_bridges(G, with_span=False))
 
-def render_bridges(G: nx.Graph, output):
-    rnd = np.random.RandomState()
-    pos = nx.spring_layout(G, iterations=15, seed=rnd)
-    plt.figure(figsize=(15, 8))
-    nx.draw_networkx(G, pos=pos, node_size=10, with_labels=False, width=0.15)
+    if pos is None:
+        pos = layout(G, iterations)
+    with figure(output) as ax:
+        if renderer == "fast":
+            xy, index = draw_fast(G, pos, ax)
+            draw_edges_fast(xy, index, local_bridges, ax, 0.5, "lawngreen")
+            draw_edges_fast(xy, index, bridges, ax, 0.5, "r")
+        else:
+            nx.draw_networkx(
+                G, pos=pos, ax=ax, node_size=10, with_labels=False, width=0.15
+            )
 
-    # green color for local bridges
-    nx.draw_networkx_edges(
-        G, pos, edgelist=local_bridges(G), width=0.5, edge_color="lawngreen"
-    )
+            # green color for local bridges
+            nx.draw_networkx_edges(
+                G, pos, edgelist=local_bridges, ax=ax, width=0.5, edge_color="lawngreen"
+            )
 
-    # red color for bridges
-    nx.draw_networkx_edges(G, pos, edgelist=bridges(G), width=0.5, edge_color="r")
+            # red color for bridges
+            nx.draw_networkx_edges(
+                G, pos, edgelist=bridges, ax=ax, width=0.5, edge_color="r"
+            )
 
-    plt.axis("off")
-    plt.tight_layout()
-    plt.savefig(output, format="PNG", bbox_inches="tight", dpi=300)
+        ax.axis("off")
 
 
 def render_centrality_distribution(
@@ -70,27 +401,38 @@ def render_centrality_distribution(
     x_label="Centrality",
     ticks=None,
 ):
-    plt.figure(figsize=(15, 8))
-    plt.hist(data.values(), bins=bins, edgecolor="black")
-    if ticks is not None:
-        plt.xticks(ticks=ticks)  # set the x axis ticks
-    plt.title(title, fontdict={"size": 35}, loc="center")
-    plt.xlabel(x_label, fontdict={"size": 20})
-    plt.ylabel("Counts", fontdict={"size": 20})
-    plt.tight_layout()
-    plt.savefig(output, format="PNG", bbox_inches="tight", dpi=300)
+    with figure(output) as ax:
+        ax.hist(data.values(), bins=bins, edgecolor="black")
+        if ticks is not None:
+            ax.set_xticks(ticks)  # set the x axis ticks
+        ax.set_title(title, fontdict={"size": 35}, loc="center")
+        ax.set_xlabel(x_label, fontdict={"size": 20})
+        ax.set_ylabel("Counts", fontdict={"size": 20})
 
 
 def render_centrality_graph(
-    G: nx.Graph or nx.DiGraph, data, output, iterations: int = 15, size_multiplier=1000
+    G: nx.Graph or nx.DiGraph,
+    data,
+    output,
+    iterations: int = 15,
+    size_multiplier=1000,
+    pos: dict = None,
+    renderer: str = "default",
 ):
-    rnd = np.random.RandomState()
-    pos = nx.spring_layout(G, iterations=iterations, seed=rnd)
+    if pos is None:
+        pos = layout(G, iterations)
     # set up nodes size for a nice graph representation
     node_size = [v * size_multiplier for v in data.values()]
-    plt.figure(figsize=(15, 8))
-    nx.draw_networkx(G, pos=pos, node_size=node_size, with_labels=False, width=0.15)
-    plt.axis("off")
-
-    plt.tight_layout()
-    plt.savefig(output, format="PNG", bbox_inches="tight", dpi=300)
+    with figure(output) as ax:
+        if renderer == "fast":
+            draw_fast(G, pos, ax, node_size=node_size)
+        else:
+            nx.draw_networkx(
+                G,
+                pos=pos,
+                ax=ax,
+                node_size=node_size,
+                with_labels=False,
+                width=0.15,
+            )
+        ax.axis("off")
@@ -0,0 +1,356 @@
+import json
+import os
+import tempfile
+from os.path import dirname
+import networkx as nx
+import numpy as np
+import scipy as sp
+import scipy.sparse.csgraph  # noqa: F401
+from .analysis import Analysis
+from .cache import decode_labels, edges_hash, encode_labels
+from .graph import (
+    clustering_coefficients,
+    from_arrays,
+    group_nodes,
+    read_edges,
+    stats_components,
+)
+
+# The stats of a component, and those only an approximation has.
+STATS_FIELDS = ["count_nodes", "count_edges", "diameter", "average_path"]
+APPROXIMATE_FIELDS = ["diameter_upper", "average_path_confidence", "samples"]
+
+
+def edge_array(edges: list) -> np.ndarray:
+    return np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def edge_keys(edges: np.ndarray, n: int) -> np.ndarray:
+    """A key for every edge that is the same in both directions."""
+    edges = np.sort(np.asarray(edges, dtype=np.int64), axis=1)
+
+    return edges[:, 0] * n + edges[:, 1]
+
+
+def save_state(
+    output: str,
+    G: nx.Graph,
+    analysis: Analysis,
+    component_stats: list,
+    samples: int = None,
+    seed: int = None,
+):
+    """Store the topology of an undirected graph, so that `update` can add edges.
+
+    Next to the graph itself, the state keeps the degree and the triangles of
+    every node, the component of every node with the stats of every component,
+    the bridges and the local bridges. The stats are only valid for the samples
+    and the seed they were computed with, so these are kept as well.
+    """
+    blob, offsets = encode_labels(G.graph["labels"])
+    component = np.empty(len(G), dtype=np.int64)
+    for i, nodes in enumerate(analysis.components):
+        component[np.fromiter(nodes, dtype=np.int64, count=len(nodes))] = i
+
+    fields = STATS_FIELDS + (APPROXIMATE_FIELDS if samples is not None else [])
+    stats = {
+        f"stats_{field}": np.array([c[field] for c in component_stats])
+        for field in fields
+    }
+
+    directory = dirname(output) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary file first, an update never reads a partial state.
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                labels=blob,
+                offsets=offsets,
+                edges=G.graph["edges"],
+                degree=analysis.degree,
+                triangles=analysis.triangles,
+                component=component,
+                bridges=edge_array(analysis.bridges),
+                local_bridges=edge_array(analysis.local_bridges),
+                parameters=np.array(json.dumps({"samples": samples, "seed": seed})),
+                **stats,
+            )
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_state(input: str) -> dict:
+    """Load a state stored by `save_state`."""
+    with np.load(input) as arrays:
+        state = dict(arrays)
+
+    state.update(json.loads(state.pop("parameters").item()))
+    state["labels"] = decode_labels(state["labels"], state.pop("offsets"))
+
+    fields = [f for f in STATS_FIELDS + APPROXIMATE_FIELDS if f"stats_{f}" in state]
+    columns = {f: state.pop(f"stats_{f}").tolist() for f in fields}
+    state["component_stats"] = [dict(zip(columns, c)) for c in zip(*columns.values())]
+
+    return state
+
+
+def find(parent: list, x: int) -> int:
+    """The root of x in a union-find forest, halving the path on the way."""
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+
+    return x
+
+
+def edge_key(u: int, v: int) -> tuple:
+    return (u, v) if u < v else (v, u)
+
+
+class IncrementalTopology:
+    """The topology of an undirected graph, kept up to date while edges are added.
+
+    Degrees, triangles and local bridges only change around the new edge. The
+    components are merged in a union-find forest. The bridges are the edges of a
+    rooted forest of the 2-edge-connected components, every one of them links a
+    2-edge-connected component to the one above it. An edge between components
+    hangs the smaller tree from the larger one, an edge within a component merges
+    the 2-edge-connected components on the tree path between its ends. The stats
+    of the components, i.e. their diameter and average path, can't be updated
+    and are only computed again for components that got new edges.
+    """
+
+    def __init__(self, state: dict):
+        labels, edges = state["labels"], state["edges"]
+        n = len(labels)
+
+        self.G = from_arrays(labels, edges, "undirected")
+        self.samples = state["samples"]
+        self.seed = state["seed"]
+        self.degree = state["degree"].tolist()
+        self.triangles = state["triangles"].tolist()
+        self.loops = [False] * n
+        for u, _ in nx.selfloop_edges(self.G):
+            self.loops[u] = True
+
+        # Every component is rooted in its first node, which also keys its stats.
+        component = state["component"]
+        first = np.full(len(state["component_stats"]), n, dtype=np.int64)
+        np.minimum.at(first, component, np.arange(n))
+        self.parent = first[component].tolist()
+        self.size = [0] * n
+        for root, size in zip(first.tolist(), np.bincount(component).tolist()):
+            self.size[root] = size
+        self.stats = dict(zip(first.tolist(), state["component_stats"]))
+        self.changed = set()
+
+        # The 2-edge-connected components are what is left without the bridges.
+        bridges = state["bridges"]
+        keep = ~np.isin(edge_keys(edges, n), edge_keys(bridges, n))
+        adjacency = sp.sparse.coo_array(
+            (np.ones(keep.sum()), (edges[keep, 0], edges[keep, 1])), shape=(n, n)
+        )
+        k, ecc = sp.sparse.csgraph.connected_components(adjacency, directed=False)
+        self.ecc = ecc.tolist()
+        self.ecc_parent = list(range(k))
+        self.up = [None] * k
+        self.bridge = {}
+
+        links = {}
+        for u, v in bridges.tolist():
+            links.setdefault(self.ecc[u], []).append((self.ecc[v], edge_key(u, v)))
+            links.setdefault(self.ecc[v], []).append((self.ecc[u], edge_key(u, v)))
+
+        for root in list(links):
+            if root not in links:
+                continue
+            frontier = [root]
+            while frontier:
+                p = frontier.pop()
+                for q, bridge in links.pop(p, []):
+                    if q != root and q not in self.bridge:
+                        self.up[q], self.bridge[q] = p, bridge
+                        frontier.append(q)
+
+        self.local_bridges = {
+            edge_key(u, v) for u, v in state["local_bridges"].tolist()
+        }
+
+    def add_nodes(self, count: int):
+        n = len(self.G)
+
+        self.G.add_nodes_from(range(n, n + count))
+        self.degree.extend([0] * count)
+        self.triangles.extend([0] * count)
+        self.loops.extend([False] * count)
+        self.parent.extend(range(n, n + count))
+        self.size.extend([1] * count)
+
+        k = len(self.ecc_parent)
+        self.ecc.extend(range(k, k + count))
+        self.ecc_parent.extend(range(k, k + count))
+        self.up.extend([None] * count)
+
+    def above(self, a: int):
+        """The 2-edge-connected component above a in its tree, if any."""
+        p = self.up[a]
+
+        return None if p is None else find(self.ecc_parent, p)
+
+    def hang(self, a: int, b: int, bridge: tuple):
+        """Hang the tree of a from b, turning it so that a is its root."""
+        child, parent = a, b
+
+        while child is not None:
+            above = self.above(child)
+            self.up[child], parent = parent, child
+            self.bridge[child], bridge = bridge, self.bridge.get(child)
+            child = above
+
+    def path(self, a: int, b: int) -> list:
+        """The 2-edge-connected components on the tree path from a to b.
+
+        Both ends climb up in turns until one of them reaches a component the
+        other one has passed, the top of the path, which comes first.
+        """
+        sides, seen = ([a], [b]), ({a}, {b})
+
+        while True:
+            for i in (0, 1):
+                top = sides[i][-1]
+                if top in seen[1 - i]:
+                    other = sides[1 - i]
+                    return [top, *sides[i][:-1], *other[: other.index(top)]]
+
+                above = self.above(top)
+                if above is not None:
+                    sides[i].append(above)
+                    seen[i].add(above)
+
+    def merge(self, path: list):
+        """Merge the 2-edge-connected components on a path into its top one."""
+        for p in path[1:]:
+            self.ecc_parent[p] = path[0]
+            del self.bridge[p]
+
+    def add_edge(self, u: int, v: int):
+        G = self.G
+        if G.has_edge(u, v):
+            return
+
+        self.changed.add(u)
+
+        if u == v:
+            # A node with a self loop is a common neighbour of it and every
+            # neighbour of it, none of its edges is a local bridge.
+            if not self.loops[u]:
+                self.loops[u] = True
+                self.local_bridges.difference_update(edge_key(u, w) for w in G[u])
+            self.degree[u] += 2
+            G.add_edge(u, u)
+            return
+
+        common = G[u].keys() & G[v].keys()
+
+        for w in common:
+            self.triangles[w] += 1
+            self.local_bridges.discard(edge_key(u, w))
+            self.local_bridges.discard(edge_key(v, w))
+        self.triangles[u] += len(common)
+        self.triangles[v] += len(common)
+        if not common and not self.loops[u] and not self.loops[v]:
+            self.local_bridges.add(edge_key(u, v))
+
+        self.degree[u] += 1
+        self.degree[v] += 1
+
+        a = find(self.ecc_parent, self.ecc[u])
+        b = find(self.ecc_parent, self.ecc[v])
+        ru, rv = find(self.parent, u), find(self.parent, v)
+
+        if ru != rv:
+            if self.size[ru] < self.size[rv]:
+                self.hang(a, b, edge_key(u, v))
+            else:
+                self.hang(b, a, edge_key(u, v))
+            # roots stay the first node of their component
+            root, other = min(ru, rv), max(ru, rv)
+            self.parent[other] = root
+            self.size[root] += self.size[other]
+        elif a != b:
+            self.merge(self.path(a, b))
+
+        G.add_edge(u, v)
+
+    def add_edges_from(self, input: str):
+        """Add the edges of a CSV file, new nodes are appended in order."""
+        labels = self.G.graph["labels"]
+        index = {label: i for i, label in enumerate(labels)}
+        parts = [self.G.graph["edges"]]
+
+        for edges in read_edges(input):
+            ids = [
+                index.setdefault(node, len(index)) for edge in edges for node in edge
+            ]
+            self.add_nodes(len(index) - len(self.G))
+            for u, v in zip(ids[::2], ids[1::2]):
+                self.add_edge(u, v)
+            parts.append(np.array(ids, dtype=np.int32).reshape(-1, 2))
+
+        edges = np.concatenate(parts)
+        self.G.graph.update(
+            labels=list(index), edges=edges, hash=edges_hash(edges, "undirected")
+        )
+
+    def intermediates(self, jobs: int = 1) -> tuple:
+        """The intermediates of the topology, and the stats of its components.
+
+        Components are numbered by their first node, like networkx does.
+        """
+        G = self.G
+        n = len(G)
+
+        roots = np.array(self.parent, dtype=np.int64)
+        while not np.array_equal(roots, roots[roots]):
+            roots = roots[roots]
+
+        ids = np.zeros(n, dtype=np.int64)
+        ids[np.unique(roots)] = np.arange(len(np.unique(roots)))
+        G.graph["components"] = ids[roots]
+        components = group_nodes(G.graph["components"])
+
+        changed = {find(self.parent, x) for x in self.changed}
+        firsts = [int(nodes[0]) for nodes in components]
+        pending = [first for first in firsts if first in changed]
+        computed = stats_components(
+            G,
+            [components[i] for i, first in enumerate(firsts) if first in changed],
+            jobs,
+            self.samples,
+            self.seed,
+        )
+        stats = {**self.stats, **dict(zip(pending, computed))}
+        component_stats = [{**stats[first], "id": i} for i, first in enumerate(firsts)]
+
+        degree = np.array(self.degree, dtype=np.int64)
+        triangles = np.array(self.triangles, dtype=np.int64)
+        # like networkx, clustering ignores self loops
+        d = degree - 2 * np.array(self.loops, dtype=np.int64)
+        clustering = clustering_coefficients(triangles, d)
+
+        bridges = list(self.bridge.values())
+        intermediates = {
+            "degree": degree,
+            "triangles": triangles,
+            "clustering": dict(zip(G, clustering.tolist())),
+            "bridges": bridges,
+            "local_bridges": list(self.local_bridges),
+            "components": components,
+        }
+
+        return intermediates, component_stats
@@ -1,2 +1,15 @@
+# The layout methods and renderers of the plots, the CLI offers them without
+# importing the plot module.
+LAYOUTS = ["spring", "multilevel"]
+RENDERERS = ["default", "fast"]
+
+
 def float_str(v):
     return ("%.17f" % v).rstrip("0").rstrip(".")
+
+
+def float_strs(values: list) -> list:
+    """Format many numbers like `float_str`, formatting all of them in one go."""
+    text = ("%.17f\n" * len(values)) % tuple(values)
+
+    return [v.rstrip("0").rstrip(".") for v in text.split("\n")[:-1]]
@@ -0,0 +1,26 @@
+import pytest
+import graphctl.graph
+from graphctl.graph import build_graph
+
+EDGES = "source,target\na,b\nb,c\nc,a\nc,c\nb,a\nd,e\n"
+
+
+def adjacency(G):
+    return [(v, list(nbrs)) for v, nbrs in G.adj.items()]
+
+
+@pytest.mark.parametrize("graph", ["undirected", "directed"])
+def test_cached_graph_is_the_parsed_one(tmp_path, monkeypatch, graph):
+    monkeypatch.setenv("GRAPHCTL_CACHE_DIR", str(tmp_path / "cache"))
+    (tmp_path / "edges.csv").write_text(EDGES)
+    parsed = build_graph(str(tmp_path / "edges.csv"), graph)
+
+    def parse(input):
+        raise AssertionError("the cached graph is parsed again")
+
+    monkeypatch.setattr(graphctl.graph, "edge_arrays", parse)
+    cached = build_graph(str(tmp_path / "edges.csv"), graph)
+
+    assert cached.graph["labels"] == parsed.graph["labels"]
+    assert cached.graph["hash"] == parsed.graph["hash"]
+    assert adjacency(cached) == adjacency(parsed)
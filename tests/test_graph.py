@@ -0,0 +1,77 @@
+import networkx as nx
+import numpy as np
+import pytest
+import graphctl.graph
+import graphctl.parallel
+from graphctl.graph import (
+    PARALLEL_MIN_NODES,
+    adaptive_betweenness_centrality,
+    add_edge_array,
+    eigenvector_centrality,
+    read_edges,
+)
+
+
+def test_eigenvector_centrality_matches_networkx():
+    G = nx.gnp_random_graph(60, 0.08, seed=1, directed=True)
+    expected = nx.eigenvector_centrality(G)
+
+    assert eigenvector_centrality(G) == pytest.approx(expected, abs=1e-12)
+    # the eigenvector solved for when the power iteration stops early
+    assert eigenvector_centrality(G, max_iter=3) == pytest.approx(expected, abs=1e-5)
+
+
+def test_eigenvector_centrality_fails_on_reducible_digraph():
+    # two cycles, one feeding the other, share their leading eigenvalue
+    G = nx.DiGraph([(0, 1), (1, 2), (2, 0), (2, 3), (3, 4), (4, 5), (5, 3), (6, 7)])
+
+    with pytest.raises(nx.PowerIterationFailedConvergence):
+        nx.eigenvector_centrality(G)
+    with pytest.raises(nx.PowerIterationFailedConvergence):
+        eigenvector_centrality(G)
+
+
+def test_read_edges_skips_blank_lines(tmp_path):
+    (tmp_path / "edges.csv").write_text("source,target\na,b\n\nb,c\n\n")
+
+    assert list(read_edges(str(tmp_path / "edges.csv"))) == [[("a", "b"), ("b", "c")]]
+
+
+@pytest.mark.parametrize("cls", [nx.Graph, nx.DiGraph])
+def test_add_edge_array_matches_add_edges_from(cls):
+    rng = np.random.default_rng(1)
+    # with self loops, duplicates and edges in both directions
+    edges = rng.integers(0, 40, size=(300, 2), dtype=np.int32)
+    expected, G = cls(), cls()
+    expected.add_nodes_from(range(50))
+    expected.add_edges_from(edges.tolist())
+    G.add_nodes_from(range(50))
+    add_edge_array(G, edges)
+
+    assert [(v, list(nbrs)) for v, nbrs in G.adj.items()] == [
+        (v, list(nbrs)) for v, nbrs in expected.adj.items()
+    ]
+    if G.is_directed():
+        assert [(v, list(nbrs)) for v, nbrs in G.pred.items()] == [
+            (v, list(nbrs)) for v, nbrs in expected.pred.items()
+        ]
+        assert all(G.succ[u][v] is G.pred[v][u] for u, v in G.edges())
+    else:
+        assert all(G[u][v] is G[v][u] for u, v in G.edges())
+
+
+def test_adaptive_betweenness_starts_one_pool(monkeypatch):
+    G = nx.barabasi_albert_graph(PARALLEL_MIN_NODES, 2, seed=1)
+    expected, used = adaptive_betweenness_centrality(G, 20, seed=1, tolerance=0)
+    pools = []
+
+    def start_pool(G, processes):
+        pools.append(processes)
+        return graphctl.parallel.start_pool(G, processes)
+
+    monkeypatch.setattr(graphctl.graph, "start_pool", start_pool)
+    b = adaptive_betweenness_centrality(G, 20, seed=1, jobs=2, tolerance=0)
+
+    assert used > 20
+    assert b == (pytest.approx(expected), used)
+    assert pools == [2]
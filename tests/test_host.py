@@ -0,0 +1,23 @@
+from click.testing import CliRunner
+from graphctl import cli
+from graphctl.host import FORMATS, read_from_file
+
+EDGES = "source,target\na,b\nb,c\nc,a\nc,d\nd,e\n"
+
+
+def topology(tmp_path, format):
+    output = tmp_path / "topology.csv"
+    args = ["--no-cache", "topology", "basic", "--format", format]
+    result = CliRunner().invoke(cli, [*args, str(tmp_path / "edges.csv"), str(output)])
+    assert result.exit_code == 0, result.output or repr(result.exception)
+
+    return read_from_file(str(output.with_suffix(f".{format}")))
+
+
+def test_binary_topology_keeps_the_values_of_the_csv(tmp_path):
+    (tmp_path / "edges.csv").write_text(EDGES)
+    expected = topology(tmp_path, "csv")
+
+    assert {row["measure"]: row["value"] for row in expected}["Has Bridges?"] == "True"
+    for format in set(FORMATS) - {"csv"}:
+        assert topology(tmp_path, format) == expected
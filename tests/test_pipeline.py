@@ -0,0 +1,103 @@
+import os
+from functools import partial
+import networkx as nx
+from click.testing import CliRunner
+from graphctl import cli
+from graphctl.parallel import map_items
+from graphctl.pipeline import Task, run
+
+EDGES = [(0, 1), (1, 2), (2, 0), (2, 3), (3, 4), (4, 5), (5, 3), (6, 7)]
+# strongly connected, so that every centrality of the directed graph exists
+DIRECTED_EDGES = EDGES + [(5, 0), (5, 6), (7, 0)]
+
+
+def write_edges(path, edges=EDGES):
+    with open(path, "w") as f:
+        f.write("source,target\n")
+        f.writelines(f"n{u},n{v}\n" for u, v in edges)
+
+
+def run_all(*args):
+    result = CliRunner().invoke(cli, ["--no-cache", "all", *args])
+    assert result.exit_code == 0, result.output or repr(result.exception)
+
+    return result
+
+
+def test_all_resumes_directed(tmp_path):
+    write_edges(tmp_path / "edges.csv", DIRECTED_EDGES)
+    args = ["-g", "directed", str(tmp_path / "edges.csv"), str(tmp_path / "out")]
+
+    run_all(*args)
+    written = os.stat(tmp_path / "out" / "topology.csv").st_mtime_ns
+    run_all(*args)
+
+    assert os.stat(tmp_path / "out" / "topology.csv").st_mtime_ns == written
+    assert not (tmp_path / "out" / "state.npz").exists()
+
+
+def test_all_resumes_undirected(tmp_path):
+    write_edges(tmp_path / "edges.csv")
+    args = ["-g", "undirected", str(tmp_path / "edges.csv"), str(tmp_path / "out")]
+
+    run_all(*args)
+    written = os.stat(tmp_path / "out" / "state.npz").st_mtime_ns
+    run_all(*args)
+
+    assert os.stat(tmp_path / "out" / "state.npz").st_mtime_ns == written
+
+
+def test_all_writes_the_files_update_replaced_again(tmp_path):
+    write_edges(tmp_path / "edges.csv")
+    write_edges(tmp_path / "delta.csv", [(7, 8), (8, 0)])
+    out = tmp_path / "out"
+    args = ["-g", "undirected", str(tmp_path / "edges.csv"), str(out)]
+
+    run_all(*args)
+    topology = (out / "topology.csv").read_text()
+    written = os.stat(out / "centrality-betweenness.csv").st_mtime_ns
+    result = CliRunner().invoke(
+        cli, ["update", str(out / "state.npz"), str(tmp_path / "delta.csv")]
+    )
+    assert result.exit_code == 0, result.output or repr(result.exception)
+    assert (out / "topology.csv").read_text() != topology
+    run_all(*args)
+
+    assert (out / "topology.csv").read_text() == topology
+    assert os.stat(out / "centrality-betweenness.csv").st_mtime_ns == written
+
+
+def process(G, jobs=None, **inputs):
+    return os.getpid()
+
+
+def test_run_keeps_tasks_with_workers_in_this_process():
+    tasks = {
+        "light": Task(process, output="light"),
+        "heavy": Task(partial(process, jobs=2), {"light": "light"}, "heavy"),
+        "plot": Task(process, {"heavy": "heavy"}, "plot"),
+    }
+    values = run(nx.path_graph(3), tasks, jobs=2)
+
+    assert values["heavy"] == os.getpid()
+    assert values["light"] != os.getpid()
+    assert values["plot"] != os.getpid()
+
+
+def parent(G, item):
+    return os.getppid()
+
+
+def start_workers(G, jobs=None, **inputs):
+    return map_items(parent, G, [0, 1], jobs)
+
+
+def test_run_forks_no_workers_next_to_its_pool():
+    tasks = {
+        "light": Task(process, output="light"),
+        "heavy": Task(partial(start_workers, jobs=2), {"light": "light"}, "heavy"),
+    }
+    values = run(nx.path_graph(3), tasks, jobs=2)
+
+    # the workers of the task come from a fork server, not from this process
+    assert os.getpid() not in values["heavy"]
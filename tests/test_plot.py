@@ -0,0 +1,35 @@
+import gc
+import tracemalloc
+import matplotlib.pyplot as plt
+import networkx as nx
+from graphctl.plot import render_centrality_distribution, render_graph
+
+
+def render(G, pos, output):
+    render_graph(G, output, pos=pos)
+    render_centrality_distribution(nx.degree_centrality(G), output)
+
+
+def test_renders_reuse_one_figure(tmp_path):
+    G = nx.barabasi_albert_graph(200, 2, seed=1)
+    pos = nx.spring_layout(G, seed=1)
+    output = tmp_path / "plot.png"
+
+    # the first renders fill the caches of matplotlib
+    render(G, pos, output)
+    tracemalloc.start()
+    try:
+        render(G, pos, output)
+        gc.collect()
+        start, _ = tracemalloc.get_traced_memory()
+        for _ in range(3):
+            render(G, pos, output)
+        gc.collect()
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(plt.get_fignums()) == 1
+    # figures that are kept alive hold on to their artists, a figure per plot
+    # grows by megabytes over these renders
+    assert end - start < 1 << 20
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["numpy", "networkx", "scipy", "matplotlib", "pyarrow"]
+
+
+def python(code: str, *args) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", code, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_cli_imports_no_heavy_modules():
+    result = python(
+        "import sys, graphctl.cli; "
+        f"print(*sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+
+    assert result.stdout.split() == []
+
+
+def test_help_is_fast():
+    start = time.perf_counter()
+    result = python("from graphctl import main; main()", "--help")
+
+    assert "Usage" in result.stdout
+    # loose enough for slow machines, importing the heavy modules alone takes
+    # about a second
+    assert time.perf_counter() - start < 2
@@ -0,0 +1,103 @@
+import networkx as nx
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from graphctl import cli
+from graphctl.state import load_state
+
+# a triangle with a tail and a path, the deltas add self loops, duplicates in
+# both directions, new nodes and edges that merge components
+BASE = [(0, 1), (1, 2), (2, 0), (2, 3), (3, 4), (5, 6), (6, 7)]
+DELTAS = [
+    [(3, 3), (0, 1), (1, 0), (8, 9), (9, 10), (11, 12)],
+    [(4, 5), (5, 4), (10, 0), (10, 10), (12, 13), (7, 5)],
+]
+
+
+def random_edges(n: int, m: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+
+    return [tuple(e) for e in rng.integers(0, n, size=(m, 2)).tolist()]
+
+
+def write_edges(path, edges):
+    with open(path, "w") as f:
+        f.write("source,target\n")
+        f.writelines(f"n{u},n{v}\n" for u, v in edges)
+
+
+def invoke(*args):
+    result = CliRunner().invoke(cli, ["--no-cache", *map(str, args)])
+    assert result.exit_code == 0, result.output or repr(result.exception)
+
+
+def bridges(edges: np.ndarray) -> list:
+    return sorted(map(tuple, np.sort(edges, axis=1).tolist()))
+
+
+def assert_same_state(updated: dict, full: dict):
+    assert updated.keys() == full.keys()
+    for key in full:
+        if key in ["bridges", "local_bridges"]:
+            assert bridges(updated[key]) == bridges(full[key]), key
+        elif isinstance(full[key], np.ndarray):
+            assert np.array_equal(updated[key], full[key]), key
+        else:
+            assert updated[key] == full[key], key
+
+
+@pytest.mark.parametrize("approximate", [[], ["--approximate", "--path-samples", 3]])
+@pytest.mark.parametrize(
+    "base, deltas",
+    [
+        (BASE, DELTAS),
+        (random_edges(60, 50, 1), [random_edges(80, 30, 2), random_edges(90, 30, 3)]),
+    ],
+)
+def test_update_matches_a_run_on_all_edges(tmp_path, approximate, base, deltas):
+    assert nx.number_connected_components(nx.Graph(base)) > 1
+    write_edges(tmp_path / "base.csv", base)
+    state = tmp_path / "base" / "state.npz"
+    (tmp_path / "base").mkdir()
+    invoke(
+        "topology",
+        "basic",
+        *approximate,
+        "--state",
+        state,
+        tmp_path / "base.csv",
+        tmp_path / "base" / "topology.csv",
+    )
+    edges = list(base)
+
+    # every update starts from the state the one before wrote
+    for i, delta in enumerate(deltas):
+        edges += delta
+        updated, full = tmp_path / f"update{i}", tmp_path / f"full{i}"
+        full.mkdir()
+        write_edges(tmp_path / f"delta{i}.csv", delta)
+        write_edges(tmp_path / f"edges{i}.csv", edges)
+
+        invoke("update", state, tmp_path / f"delta{i}.csv", updated)
+        invoke(
+            "topology",
+            "basic",
+            *approximate,
+            "--state",
+            full / "state.npz",
+            tmp_path / f"edges{i}.csv",
+            full / "topology.csv",
+        )
+        invoke(
+            "centrality",
+            "degree",
+            tmp_path / f"edges{i}.csv",
+            full / "centrality-degree.csv",
+        )
+
+        for name in ["topology.csv", "centrality-degree.csv"]:
+            assert (updated / name).read_text() == (full / name).read_text(), name
+        updated_state = load_state(str(updated / "state.npz"))
+        assert_same_state(updated_state, load_state(str(full / "state.npz")))
+        assert updated_state["samples"] == (3 if approximate else None)
+        state = updated / "state.npz"